@@ -0,0 +1,169 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+import argparse
+from datetime import datetime
+from portfolio import RISK_FREE, load_returns
+
+# === Regime-switching backtest ===
+# Every array carries any number of leading "parameter" axes, so a whole grid
+# of settings is one set of NumPy operations over (..., T) or (..., T, N):
+#   target weights  "prob": regime probabilities (T, K) times the regime
+#                   weight table (K, N); "hard": the table row of the most
+#                   likely regime, switching only when its probability
+#                   reaches `threshold` (otherwise the previous regime is
+#                   held); one threshold per leading index
+#   execution       target weights set at the end of month t are held over
+#                   month t + lag (lag=0 reproduces the legacy
+#                   portfolio_returns files, which look ahead one month)
+#   turnover        |target - drifted previous weights|, the first month
+#                   buying in from cash; costs are cost * turnover
+# Metrics (return, volatility, Sharpe, Sortino, drawdown, turnover) reduce
+# the last axis, so they come out with the grid's shape.
+
+
+def hard_switch_regimes(probs, threshold=0.0):
+    threshold = np.asarray(threshold, dtype=float)[..., None]
+    T = len(probs)
+    confident = probs.max(axis=1) >= threshold
+    # Index of the last confident month so far; months before the first one use month 0's regime
+    last = np.maximum.accumulate(np.where(confident, np.arange(T), 0), axis=-1)
+    return probs.argmax(axis=1)[last]
+
+
+# (..., T, N) target weights; missing table entries are not held
+def target_weights(probs, table, mode="prob", threshold=0.0):
+    probs, table = np.asarray(probs, dtype=float), np.nan_to_num(np.asarray(table, dtype=float))
+    if mode == "prob":
+        weights = probs / probs.sum(axis=1, keepdims=True) @ table
+        return np.broadcast_to(weights, np.shape(threshold) + weights.shape)
+    return table[hard_switch_regimes(probs, threshold)]
+
+
+# Gross/net returns and turnover of weights (..., T, N) against returns (..., T, N);
+# cost (fraction of traded value) broadcasts against the leading axes
+def run_backtest(weights, returns, cost=0.0, lag=1):
+    returns = np.nan_to_num(np.asarray(returns, dtype=float))
+    held = weights[..., :weights.shape[-2] - lag, :]
+    returns = returns[..., lag:, :]
+    gross = (held * returns).sum(axis=-1)
+
+    drifted = np.zeros(np.broadcast_shapes(held.shape, returns.shape))
+    drifted[..., 1:, :] = held[..., :-1, :] * (1 + returns[..., :-1, :]) / (1 + gross[..., :-1, None])
+    turnover = np.abs(held - drifted).sum(axis=-1)
+    net = gross - np.asarray(cost, dtype=float)[..., None] * turnover
+    return {"gross": np.broadcast_to(gross, net.shape), "net": net, "turnover": np.broadcast_to(turnover, net.shape)}
+
+
+def drawdowns(returns):
+    wealth = np.cumprod(1 + returns, axis=-1)
+    return wealth / np.maximum(np.maximum.accumulate(wealth, axis=-1), 1) - 1
+
+
+def performance(result, risk_free=RISK_FREE, periods=12):
+    net = result["net"]
+    mean, std = net.mean(axis=-1), net.std(axis=-1, ddof=1)
+    downside = np.sqrt((np.minimum(net - risk_free, 0) ** 2).mean(axis=-1))
+    sharpe = (mean - risk_free) / std
+    return {
+        "Monthly Return": mean,
+        "Monthly Volatility": std,
+        "Annual Return": (1 + mean) ** periods - 1,
+        "Annual Volatility": std * np.sqrt(periods),
+        "Sharpe Ratio": sharpe,
+        "Annual Sharpe": sharpe * np.sqrt(periods),
+        "Annual Sortino": (mean - risk_free) / downside * np.sqrt(periods),
+        "Max Drawdown": drawdowns(net).min(axis=-1),
+        "Win Rate": (net > 0).mean(axis=-1),
+        "Annual Turnover": result["turnover"].mean(axis=-1) * periods,
+        "Annual Cost": (result["gross"] - net).mean(axis=-1) * periods,
+    }
+
+
+# One row per (threshold, cost, lag) combination
+def grid_backtest(probs, table, returns, thresholds=(0.0,), costs=(0.0,), lags=(1,), mode="hard",
+                  risk_free=RISK_FREE):
+    thresholds, costs = np.asarray(thresholds, dtype=float), np.asarray(costs, dtype=float)
+    weights = target_weights(probs, table, mode, thresholds)                    # (P, T, N)
+    frames = []
+    for lag in lags:
+        result = run_backtest(weights[:, None], returns, costs[None, :], lag)  # (P, C, T)
+        metrics = performance(result, risk_free)
+        index = pd.MultiIndex.from_product([thresholds, costs, [lag]], names=["threshold", "cost", "lag"])
+        frames.append(pd.DataFrame({k: v.ravel() for k, v in metrics.items()}, index=index))
+    return pd.concat(frames)
+
+
+# Regime probabilities for a run: stored probabilities, the legacy
+# rolling_pred_30pct_probs table, or one-hot labels
+def load_probs(conn, run_id, n_regimes):
+    from run_registry import load_series, load_frame
+
+    series = load_series(conn, run_id)
+    columns = [f"Regime_{k}" for k in range(n_regimes)]
+    if all(c in series for c in columns):
+        return series[columns]
+    try:
+        return load_frame(conn, run_id, "rolling_pred_30pct_probs")[columns]
+    except LookupError:
+        one_hot = series["Regime"].to_numpy()[:, None] == np.arange(n_regimes)
+        return pd.DataFrame(one_hot.astype(float), index=series.index, columns=columns)
+
+
+def main():
+    from run_registry import connect, find_runs, load_frame, save_frame
+
+    parser = argparse.ArgumentParser(description="Backtest a run's regime portfolios against equal weight.")
+    parser.add_argument("run_id")
+    parser.add_argument("--mode", default="prob", choices=["prob", "hard"])
+    parser.add_argument("--threshold", type=float, default=0.0, help="hard mode: probability needed to switch")
+    parser.add_argument("--cost-bps", type=float, default=10.0, help="cost per unit of turnover, in basis points")
+    parser.add_argument("--lag", type=int, default=1, help="months between signal and execution")
+    parser.add_argument("--grid", action="store_true", help="also sweep thresholds x costs x lags")
+    parser.add_argument("--csv", action="store_true", help="also write the tables to output/backtest_*.csv")
+    args = parser.parse_args()
+
+    conn = connect()
+    n_regimes = int(find_runs(conn, run_id=args.run_id)["n_regimes"].iloc[0])
+    probs = load_probs(conn, args.run_id, n_regimes)
+    table = load_frame(conn, args.run_id, "mpt_weights_by_regime")
+    returns = load_returns()[table.columns].reindex(probs.index)
+    equal = np.full_like(table.to_numpy(dtype=float), 1 / table.shape[1])
+
+    cost = args.cost_bps / 1e4
+    strategies = {"Regime-Based": table.to_numpy(dtype=float), "Equal-Weighted": equal}
+    results = {name: run_backtest(target_weights(probs, w, args.mode, args.threshold), returns, cost, args.lag)
+               for name, w in strategies.items()}
+    dates = probs.index[args.lag:]
+    metrics = pd.DataFrame({name: performance(r) for name, r in results.items()})
+    portfolio_returns = pd.DataFrame({"Regime": probs.to_numpy().argmax(axis=1)[:len(probs) - args.lag],
+                                      "Regime_Portfolio": results["Regime-Based"]["net"],
+                                      "Equal_Portfolio": results["Equal-Weighted"]["net"],
+                                      "Turnover": results["Regime-Based"]["turnover"]},
+                                     index=pd.Index(dates, name="Date"))
+    save_frame(conn, args.run_id, "backtest_metrics", metrics)
+    save_frame(conn, args.run_id, "backtest_returns", portfolio_returns)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if args.csv:
+        os.makedirs("output", exist_ok=True)
+        metrics.to_csv(f"output/backtest_metrics_{args.run_id}_{timestamp}.csv")
+        portfolio_returns.to_csv(f"output/backtest_returns_{args.run_id}_{timestamp}.csv")
+    print(metrics.round(4).to_string())
+
+    if args.grid:
+        start = time.perf_counter()
+        grid = grid_backtest(probs, table, returns, thresholds=np.linspace(0, 0.95, 20),
+                             costs=np.linspace(0, 50, 26) / 1e4, lags=[0, 1, 2], mode=args.mode)
+        elapsed = time.perf_counter() - start
+        save_frame(conn, args.run_id, "backtest_grid", grid.reset_index())
+        if args.csv:
+            grid.to_csv(f"output/backtest_grid_{args.run_id}_{timestamp}.csv")
+        print(f"{len(grid)} combinations in {elapsed:.3f}s")
+        print(grid.sort_values("Annual Sharpe", ascending=False).head(10).round(4).to_string())
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import numpy as np
+import time
+import logging
+import tracing
+from collections import defaultdict
+from sklearn import cluster
+from hmmlearn import hmm
+
+# === Batched Gaussian HMM EM ===
+# Fits a stack of B GaussianHMMs that share the sequence length T and feature
+# count D in one set of NumPy calls per EM iteration:
+#   - emissions: batched Cholesky of the (B, K, D, D) covariances
+#   - forward-backward: scaled probabilities, one (B, 1, K) x (B, K, K)
+#     matmul per time step
+#   - models with fewer regimes are padded with unreachable states, so one
+#     stack covers a whole regime-count sweep
+#   - M-step: hmmlearn's update rules and default priors (covars_prior=1e-2)
+# Initialisation follows GaussianHMM._init (Dirichlet start/transition
+# probabilities, KMeans means, pooled covariance), so a model fitted here and
+# an hmm.GaussianHMM with the same random_state follow the same EM path.
+# fit_batch() groups arbitrary (n_regimes, covariance_type, seed)
+# configurations and returns ordinary fitted hmm.GaussianHMM objects.
+
+logging.getLogger("hmmlearn.base").setLevel(logging.ERROR)
+LOG_2PI = np.log(2 * np.pi)
+COVARS_PRIOR = 1e-2
+# hmmlearn evaluates emissions with its own, smaller Cholesky retry jitter
+CHOL_JITTER = 1e-7
+
+
+def init_params(X, n_regimes, covariance_type, seed, min_covar=1e-3, init="kmeans"):
+    random_state = np.random.RandomState(seed)
+    startprob = random_state.dirichlet(np.full(n_regimes, 1.0 / n_regimes))
+    transmat = random_state.dirichlet(np.full(n_regimes, 1.0 / n_regimes), size=n_regimes)
+    if init == "kmeans":
+        means = cluster.KMeans(n_clusters=n_regimes, random_state=seed, n_init=10).fit(X).cluster_centers_
+    else:
+        means = X[random_state.choice(len(X), n_regimes, replace=False)]
+
+    cv = np.cov(X.T) + min_covar * np.eye(X.shape[1])
+    if covariance_type == "diag":
+        cv = np.diag(np.diag(cv))
+    elif covariance_type == "spherical":
+        cv = np.eye(X.shape[1]) * cv.mean()
+    covars = np.tile(cv, (n_regimes, 1, 1))
+    return startprob, transmat, means, covars
+
+
+# Batched lower Cholesky factors; singular components retried with min_covar on the diagonal
+def _cholesky(covars, min_covar):
+    try:
+        return np.linalg.cholesky(covars)
+    except np.linalg.LinAlgError:
+        chol = np.empty_like(covars)
+        eye = np.eye(covars.shape[-1])
+        for idx in np.ndindex(covars.shape[:-2]):
+            try:
+                chol[idx] = np.linalg.cholesky(covars[idx])
+            except np.linalg.LinAlgError:
+                chol[idx] = np.linalg.cholesky(covars[idx] + min_covar * eye)
+        return chol
+
+
+# (B, T, K) emission log-likelihoods for (B, T, D) data
+def log_emissions(X, means, covars, min_covar=CHOL_JITTER):
+    chol = _cholesky(covars, min_covar)
+    chol_inv = np.linalg.inv(chol)
+    log_det = 2 * np.log(np.diagonal(chol, axis1=-2, axis2=-1)).sum(axis=-1)
+    # (B, K, D, T) whitened residuals
+    z = chol_inv @ (np.swapaxes(X, 1, 2)[:, None] - means[..., None])
+    return -0.5 * (X.shape[-1] * LOG_2PI + log_det[:, None, :] + np.swapaxes((z ** 2).sum(axis=2), 1, 2))
+
+
+# Scaled (Rabiner) forward-backward: emissions are exponentiated once after a
+# per-step max shift, then each step is one (B, 1, K) @ (B, K, K) matmul plus a
+# renormalisation. log p(X) = sum of log scales + sum of shifts.
+def forward_backward(log_b, startprob, transmat):
+    B, T, K = log_b.shape
+    shift = log_b.max(axis=2, keepdims=True)
+    frame = np.exp(log_b - shift)
+
+    alpha = np.empty_like(frame)
+    scale = np.empty((B, T, 1))
+    a = startprob * frame[:, 0]
+    for t in range(T):
+        if t:
+            a = (a[:, None] @ transmat)[:, 0] * frame[:, t]
+        scale[:, t] = a.sum(axis=1, keepdims=True)
+        a = a / scale[:, t]
+        alpha[:, t] = a
+
+    # beta_t scaled by the same factors; carried as frame_{t+1} * beta_{t+1} / scale_{t+1}
+    beta = np.empty_like(frame)
+    beta[:, -1] = 1
+    weighted = np.empty_like(frame)
+    weighted[:, -1] = frame[:, -1] / scale[:, -1]
+    for t in range(T - 2, -1, -1):
+        beta[:, t] = (transmat @ weighted[:, t + 1, :, None])[:, :, 0]
+        weighted[:, t] = frame[:, t] * beta[:, t] / scale[:, t]
+
+    with np.errstate(divide="ignore"):
+        log_likelihood = np.log(scale[:, :, 0]).sum(axis=1) + shift[:, :, 0].sum(axis=1)
+
+    gamma = alpha * beta
+    gamma /= gamma.sum(axis=2, keepdims=True)
+    xi_sum = np.einsum("bti,btj->bij", alpha[:, :-1], weighted[:, 1:]) * transmat
+    return log_likelihood, gamma, xi_sum
+
+
+def m_step(X, gamma, xi_sum, startprob, transmat, covariance_type):
+    post = gamma.sum(axis=1)
+    gamma_T = np.swapaxes(gamma, 1, 2)
+    obs = gamma_T @ X
+    obs_obs = np.swapaxes(gamma_T[..., None] * X[:, None], 2, 3) @ X[:, None]
+
+    startprob = np.where(startprob == 0, 0, gamma[:, 0])
+    startprob = startprob / startprob.sum(axis=1, keepdims=True)
+    transmat = np.where(transmat == 0, 0, xi_sum)
+    transmat = transmat / transmat.sum(axis=2, keepdims=True)
+
+    # Padded states have no posterior mass; keep their statistics at zero
+    means = obs / np.where(post > 0, post, 1)[:, :, None]
+    obs_mean = obs[:, :, :, None] * means[:, :, None, :]
+    c_n = obs_obs - obs_mean - np.swapaxes(obs_mean, 2, 3) + means[:, :, :, None] * means[:, :, None, :] * post[:, :, None, None]
+
+    D = X.shape[-1]
+    if covariance_type == "full":
+        covars = (COVARS_PRIOR + c_n) / post[:, :, None, None]
+    elif covariance_type == "tied":
+        tied = (COVARS_PRIOR + c_n.sum(axis=1)) / post.sum(axis=1)[:, None, None]
+        covars = np.repeat(tied[:, None], c_n.shape[1], axis=1)
+    else:
+        var = (COVARS_PRIOR + np.diagonal(c_n, axis1=2, axis2=3)) / np.maximum(post, 1e-5)[:, :, None]
+        if covariance_type == "spherical":
+            var = np.repeat(var.mean(axis=2, keepdims=True), D, axis=2)
+        covars = var[:, :, :, None] * np.eye(D)
+    return startprob, transmat, means, covars
+
+
+# Pad a model's parameters to K states. Padded states start with zero
+# probability and are unreachable, so they never carry posterior mass; this
+# lets models with different regime counts share one stack.
+def pad_params(startprob, transmat, means, covars, K):
+    n = len(startprob)
+    padded_transmat = np.eye(K)
+    padded_transmat[:n, :n] = transmat
+    padded_covars = np.tile(np.eye(means.shape[1]), (K, 1, 1))
+    padded_covars[:n] = covars
+    return (np.pad(startprob, (0, K - n)), padded_transmat,
+            np.pad(means, ((0, K - n), (0, 0))), padded_covars)
+
+
+def _reset_padding(transmat, means, covars, real):
+    padded = ~real
+    transmat[padded] = np.eye(real.shape[1])[np.nonzero(padded)[1]]
+    means[padded] = 0
+    covars[padded] = np.eye(means.shape[-1])
+
+
+# EM on a stack that shares (T, D, covariance_type); `real` (B, K) marks the
+# non-padded states. Converged models drop out of the batch.
+def fit_stack(X, startprob, transmat, means, covars, covariance_type, n_iter=100, tol=1e-2, real=None):
+    B = len(X)
+    history = [[] for _ in range(B)]
+    active = np.arange(B)
+    traced = tracing.enabled()
+    for iteration in range(n_iter):
+        if traced:
+            start = time.perf_counter()
+        log_b = log_emissions(X[active], means[active], covars[active])
+        log_likelihood, gamma, xi_sum = forward_backward(log_b, startprob[active], transmat[active])
+        with np.errstate(invalid="ignore"):
+            new = m_step(X[active], gamma, xi_sum, startprob[active], transmat[active], covariance_type)
+        if real is not None:
+            _reset_padding(*new[1:], real[active])
+        startprob[active], transmat[active], means[active], covars[active] = new
+
+        still_active = []
+        for i, ll in zip(active, log_likelihood):
+            history[i].append(ll)
+            if not (len(history[i]) > 1 and history[i][-1] - history[i][-2] < tol):
+                still_active.append(i)
+        if traced:
+            tracing.event("em_iteration", iteration=iteration + 1, models=len(log_likelihood),
+                          log_likelihood=[float(ll) for ll in log_likelihood], seconds=time.perf_counter() - start)
+        active = np.array(still_active, dtype=int)
+        if not len(active):
+            break
+    return startprob, transmat, means, covars, history
+
+
+def _to_model(n_regimes, covariance_type, seed, n_iter, tol, startprob, transmat, means, covars, history):
+    model = hmm.GaussianHMM(n_components=n_regimes, covariance_type=covariance_type, n_iter=n_iter,
+                            tol=tol, random_state=seed)
+    model.n_features = means.shape[1]
+    model.startprob_ = startprob
+    model.transmat_ = transmat
+    model.means_ = means
+    # Set the native-shape covariances directly, as GaussianHMM's own M-step
+    # does: a degenerate regime can end EM with a singular covariance
+    if covariance_type == "full":
+        model._covars_ = covars
+    elif covariance_type == "tied":
+        model._covars_ = covars[0]
+    elif covariance_type == "diag":
+        model._covars_ = np.diagonal(covars, axis1=1, axis2=2).copy()
+    else:
+        model._covars_ = covars[:, 0, 0].copy()
+    for ll in history:
+        model.monitor_.report(ll)
+    return model
+
+
+# Drop-in for fitting hmm.GaussianHMM(n_components, covariance_type, n_iter, random_state=seed)
+# over many configurations. X is one (T, D) array shared by every
+# configuration or a list with one array per configuration.
+def fit_batch(X, configs, n_iter=100, tol=1e-2, init="kmeans", min_covar=1e-3):
+    data = [np.asarray(x, dtype=float) for x in X] if isinstance(X, (list, tuple)) else None
+    groups = defaultdict(list)
+    for i, (n_regimes, covariance_type, seed) in enumerate(configs):
+        x = data[i] if data is not None else np.asarray(X, dtype=float)
+        groups[(covariance_type, x.shape)].append(i)
+
+    models = [None] * len(configs)
+    for (covariance_type, _), members in groups.items():
+        stack = np.stack([data[i] if data is not None else np.asarray(X, dtype=float) for i in members])
+        n_states = np.array([configs[i][0] for i in members])
+        K = n_states.max()
+        params = [pad_params(*init_params(stack[j], configs[i][0], covariance_type, configs[i][2], min_covar, init), K)
+                  for j, i in enumerate(members)]
+        startprob, transmat, means, covars = (np.stack(p) for p in zip(*params))
+        real = np.arange(K) < n_states[:, None]
+        startprob, transmat, means, covars, history = fit_stack(
+            stack, startprob, transmat, means, covars, covariance_type, n_iter, tol, real)
+        for j, i in enumerate(members):
+            n = n_states[j]
+            models[i] = _to_model(n, covariance_type, configs[i][2], n_iter, tol, startprob[j, :n],
+                                  transmat[j, :n, :n], means[j, :n], covars[j, :n], history[j])
+    return models
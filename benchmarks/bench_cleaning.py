@@ -0,0 +1,81 @@
+import os
+import sys
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from clean_fred import RAW_DIR, SERIES_SPECS, clean_all
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(RAW_DIR), "clean_scripts")
+
+# The old scripts write into ../fred_series_clean relative to their cwd, so they
+# run inside a scratch copy of the tree and never touch the committed files.
+
+
+def run_scripts(sandbox):
+    shutil.copytree(RAW_DIR, os.path.join(sandbox, "fred_series"))
+    shutil.copytree(SCRIPTS_DIR, os.path.join(sandbox, "clean_scripts"))
+    os.makedirs(os.path.join(sandbox, "fred_series_clean"), exist_ok=True)
+
+    start = time.perf_counter()
+    for script in sorted(glob.glob(os.path.join(sandbox, "clean_scripts", "clean_*.py"))):
+        # clean_2y_treasury.py uses repo-root relative paths
+        cwd = sandbox if script.endswith("clean_2y_treasury.py") else os.path.dirname(script)
+        subprocess.run([sys.executable, script], cwd=cwd, check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def run_engine(sandbox, workers):
+    clean_dir = os.path.join(sandbox, f"engine_clean_w{workers}")
+    start = time.perf_counter()
+    clean_all(workers=workers, clean_dir=clean_dir)
+    return time.perf_counter() - start, clean_dir
+
+
+# Compare values only: the engine renames the AAA/BAA columns to the names
+# already used in fred_series_clean/
+def count_mismatches(script_dir, engine_dir):
+    mismatches = []
+    for name in SERIES_SPECS:
+        expected = pd.read_csv(os.path.join(script_dir, f"{name}.csv"), index_col=0)
+        actual = pd.read_csv(os.path.join(engine_dir, f"{name}.csv"), index_col=0)
+        actual.columns = expected.columns
+        if not expected.equals(actual):
+            mismatches.append(name)
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark clean_fred.py against the per-series scripts.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count()])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as sandbox:
+        script_time = run_scripts(sandbox)
+        results.append({"Method": "clean_scripts (one process each)", "Seconds": script_time})
+
+        for workers in args.workers:
+            times = []
+            for _ in range(args.repeats):
+                seconds, engine_dir = run_engine(sandbox, workers)
+                times.append(seconds)
+            results.append({"Method": f"clean_fred.py (workers={workers})", "Seconds": min(times)})
+
+        mismatches = count_mismatches(os.path.join(sandbox, "fred_series_clean"), engine_dir)
+
+    results = pd.DataFrame(results).set_index("Method")
+    results["Speedup"] = script_time / results["Seconds"]
+    print(results.round(3).to_string())
+    print(f"Series differing from script output: {mismatches or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
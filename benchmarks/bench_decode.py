@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+import argparse
+import logging
+
+import numpy as np
+import pandas as pd
+from hmmlearn import hmm
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from regime_builder_702 import load_macro_window, split_and_scale
+from hmm_decode import decode
+
+logging.getLogger("hmmlearn.base").setLevel(logging.ERROR)
+
+
+def best_time(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark predict()+predict_proba() against hmm_decode.decode().")
+    parser.add_argument("--regimes", type=int, nargs="+", default=list(range(4, 9)))
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    train_data, predict_data, train_scaled, predict_scaled, scaler = split_and_scale(load_macro_window())
+
+    results = []
+    for n_regimes in args.regimes:
+        model = hmm.GaussianHMM(n_components=n_regimes, covariance_type="full", n_iter=100, random_state=42)
+        model.fit(train_scaled)
+
+        def two_calls():
+            return model.predict(predict_scaled), model.predict_proba(predict_scaled)
+
+        states, probs = two_calls()
+        decoded = decode(model, predict_scaled, cache=False)
+        results.append({
+            "n_regimes": n_regimes,
+            "predict+predict_proba (ms)": best_time(two_calls, args.repeats) * 1000,
+            "decode (ms)": best_time(lambda: decode(model, predict_scaled, cache=False), args.repeats) * 1000,
+            "decode, cached emissions (ms)": best_time(lambda: decode(model, predict_scaled), args.repeats) * 1000,
+            "same states": bool((decoded["states"] == states).all()),
+            "max |posterior diff|": np.abs(decoded["posteriors"] - probs).max(),
+        })
+
+    results = pd.DataFrame(results).set_index("n_regimes")
+    results["speedup"] = results["predict+predict_proba (ms)"] / results["decode (ms)"]
+    print(results.to_string(float_format=lambda v: f"{v:.3g}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Seconds the update path may spend importing before any work starts, on top of a bare interpreter
+UPDATE_IMPORT_BUDGET = 0.3
+HEAVY = ["pandas", "scipy", "sklearn", "hmmlearn", "matplotlib", "seaborn"]
+
+# What each start-up imports, as a `python -c` snippet
+CASES = {
+    "bare interpreter": "pass",
+    "update path (market_regime + online_filter + feature_store)":
+        "import market_regime, online_filter, feature_store",
+    "regime_builder_702": "import regime_builder_702",
+    "online_filter with pandas + scipy (before)": "import online_filter, pandas, scipy.special",
+}
+
+
+# Median wall-clock seconds of a fresh interpreter running `code`
+def cold_start(code, repeats):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-W", "ignore", "-c", code], env=env, check=True)
+        seconds.append(time.perf_counter() - start)
+    return float(np.median(seconds))
+
+
+def loaded_heavy_modules():
+    code = ("import sys, market_regime, online_filter, feature_store; "
+            f"print(','.join(m for m in {HEAVY!r} if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], env=dict(os.environ, PYTHONPATH=ROOT), check=True,
+                         capture_output=True, text=True).stdout.strip()
+    return [m for m in out.split(",") if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time of the market_regime.py update path.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=UPDATE_IMPORT_BUDGET,
+                        help="allowed import seconds for the update path beyond a bare interpreter")
+    args = parser.parse_args()
+
+    times = pd.Series({name: cold_start(code, args.repeats) for name, code in CASES.items()})
+    overhead = times - times["bare interpreter"]
+    print(pd.DataFrame({"cold start (s)": times, "imports (s)": overhead}).to_string(float_format=lambda v: f"{v:.3f}"))
+
+    heavy = loaded_heavy_modules()
+    update_imports = overhead.iloc[1]
+    print(f"Heavy modules on the update path: {', '.join(heavy) or 'none'}")
+    print(f"Update path imports: {update_imports:.3f}s (budget {args.budget:.3f}s)")
+    if heavy or update_imports > args.budget:
+        sys.exit("Update path is over its start-up budget")
+
+
+if __name__ == "__main__":
+    main()
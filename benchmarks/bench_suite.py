@@ -0,0 +1,198 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from synthetic_data import random_hmm, sample_hmm, hmm_model, frame, raw_series, asset_returns
+
+# === Scaling benchmark on synthetic data ===
+# Each size "T,D,K" draws T observations of D indicators from a known K-regime
+# HMM (synthetic_data) and times the pipeline stages on them:
+#   clean     clean_fred.clean_frame on a raw hourly series of T rows
+#             (monthly last + volatility, and monthly mean)
+#   scale     StandardScaler fit_transform
+#   fit       GaussianHMM EM, a fixed number of iterations
+#   fit_batch batched_hmm.fit_batch, the same iterations
+#   decode    hmm_decode.decode with the true parameters (accuracy against
+#             the true path is reported as a sanity check)
+#   granger   granger.granger_matrix of the indicators against N assets
+#   backtest  backtest.grid_backtest over thresholds x costs x lags
+# Stages whose memory grows faster than T x D (EM's T x K x D x D emission
+# terms, granger's indicator x asset x T designs) run on the first rows only;
+# the rows a stage actually used are recorded with its time.
+# Warnings raised by a stage are counted with its row (and the first one
+# kept) rather than hidden. Every result is appended to --results with the
+# code version (git describe), so --compare shows changes between versions.
+
+STAGES = ["clean", "scale", "fit", "fit_batch", "decode", "granger", "backtest"]
+DEFAULT_SIZES = ["290,15,4", "10000,15,4", "10000,100,4", "10000,15,20", "100000,15,8", "1000000,15,4"]
+RESULTS_PATH = os.path.join("output", "bench_suite.csv")
+
+
+def version():
+    try:
+        out = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT, capture_output=True, text=True,
+                             check=True).stdout.strip()
+        return out or "unknown"
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return time.perf_counter() - start, out
+
+
+def stage_clean(data, args):
+    from clean_fred import clean_frame, get_spec
+
+    raw = raw_series(data["T"], seed=args.seed)
+    seconds = 0.0
+    for spec in [get_spec("AAA Corporate Bond Yield"), get_spec("TED Spread")]:
+        spec = {**spec, "columns": None}
+        seconds += timed(clean_frame, raw, spec)[0]
+    return {"seconds": seconds, "rows": data["T"]}
+
+
+def stage_scale(data, args):
+    from sklearn.preprocessing import StandardScaler
+
+    seconds, data["scaled"] = timed(StandardScaler().fit_transform, data["X"])
+    return {"seconds": seconds, "rows": len(data["X"])}
+
+
+def _fit_rows(data, args):
+    return data["scaled"][:args.fit_rows]
+
+
+def stage_fit(data, args):
+    from hmmlearn import hmm
+
+    X = _fit_rows(data, args)
+    model = hmm.GaussianHMM(n_components=data["K"], covariance_type="full", n_iter=args.n_iter, tol=-np.inf,
+                            random_state=args.seed)
+    seconds = timed(model.fit, X)[0]
+    return {"seconds": seconds, "rows": len(X), "per_iteration": seconds / len(model.monitor_.history)}
+
+
+def stage_fit_batch(data, args):
+    from batched_hmm import fit_batch
+
+    X = _fit_rows(data, args)
+    seconds, models = timed(fit_batch, X, [(data["K"], "full", args.seed)], args.n_iter, -np.inf)
+    return {"seconds": seconds, "rows": len(X), "per_iteration": seconds / len(models[0].monitor_.history)}
+
+
+def stage_decode(data, args):
+    from hmm_decode import decode
+
+    seconds, decoded = timed(decode, hmm_model(data["params"]), data["X"].astype(float), False)
+    accuracy = float((decoded["states"] == data["states"]).mean())
+    return {"seconds": seconds, "rows": len(data["X"]), "accuracy": accuracy}
+
+
+def stage_granger(data, args):
+    from granger import granger_matrix
+
+    rows = min(data["T"], args.granger_rows)
+    indicators = frame(data["X"][:rows])
+    sectors = frame(data["returns"][:rows], prefix="Asset")
+    seconds = timed(granger_matrix, indicators, sectors, args.maxlag)[0]
+    return {"seconds": seconds, "rows": rows}
+
+
+def stage_backtest(data, args):
+    from backtest import grid_backtest
+
+    probs = np.eye(data["K"])[data["states"]] * 0.8 + 0.2 / data["K"]
+    table = np.random.default_rng(args.seed).dirichlet(np.ones(args.assets), size=data["K"])
+    thresholds, costs = np.linspace(0, 0.9, 10), np.linspace(0, 0.005, 10)
+    seconds = timed(grid_backtest, probs, table, data["returns"], thresholds, costs, [0, 1, 2])[0]
+    return {"seconds": seconds, "rows": data["T"], "combinations": 300}
+
+
+def generate(T, D, K, args):
+    params = random_hmm(K, D, seed=args.seed)
+    seconds, (states, X) = timed(sample_hmm, params, T, args.seed)
+    return {"T": T, "D": D, "K": K, "params": params, "states": states, "X": X,
+            "returns": asset_returns(states, args.assets, args.seed), "generate_seconds": seconds}
+
+
+def run_size(size, args):
+    T, D, K = (int(v) for v in size.split(","))
+    data = generate(T, D, K, args)
+    rows = [{"stage": "generate", "seconds": data["generate_seconds"], "rows": T}]
+    for stage in args.stages:
+        if stage in ("fit", "fit_batch", "decode") and "scaled" not in data:
+            stage_scale(data, args)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            result = globals()[f"stage_{stage}"](data, args)
+        result["warnings"] = len(caught)
+        result["first_warning"] = f"{caught[0].category.__name__}: {caught[0].message}" if caught else None
+        rows.append({"stage": stage, **result})
+        note = f", {len(caught)} warnings" if caught else ""
+        print(f"  {size:<14} {stage:<10} {result['seconds']:8.3f}s  ({result['rows']} rows{note})", flush=True)
+    return [{"T": T, "D": D, "K": K, **row} for row in rows]
+
+
+# Median seconds per stage and size for the latest two versions in the results file
+def compare(results):
+    versions = results.drop_duplicates("version", keep="last")["version"].tolist()[-2:]
+    table = (results[results["version"].isin(versions)]
+             .groupby(["stage", "T", "D", "K", "version"])["seconds"].median().unstack("version"))
+    table = table[versions]
+    if len(versions) == 2:
+        table["ratio"] = table[versions[1]] / table[versions[0]]
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the pipeline stages on synthetic HMM data of growing size.")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="T,D,K triples")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--n-iter", type=int, default=5, help="EM iterations per fit")
+    parser.add_argument("--fit-rows", type=int, default=100_000, help="rows the fit stages use at most")
+    parser.add_argument("--granger-rows", type=int, default=5_000, help="rows the granger stage uses at most")
+    parser.add_argument("--maxlag", type=int, default=6)
+    parser.add_argument("--assets", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results", default=RESULTS_PATH, help="CSV the results are appended to")
+    parser.add_argument("--label", default=None, help="version label (default: git describe)")
+    parser.add_argument("--compare", action="store_true", help="only compare the latest two versions in --results")
+    args = parser.parse_args()
+
+    if args.compare:
+        print(compare(pd.read_csv(args.results)).to_string(float_format=lambda v: f"{v:.3g}"))
+        return
+
+    label, timestamp = args.label or version(), datetime.now().isoformat(timespec="seconds")
+    rows = []
+    for size in args.sizes:
+        rows += run_size(size, args)
+    results = pd.DataFrame(rows)
+    results.insert(0, "version", label)
+    results.insert(1, "timestamp", timestamp)
+    results["rows_per_second"] = results["rows"] / results["seconds"]
+
+    os.makedirs(os.path.dirname(args.results) or ".", exist_ok=True)
+    if os.path.exists(args.results):
+        results = pd.concat([pd.read_csv(args.results), results], ignore_index=True)
+    results.to_csv(args.results, index=False)
+    latest = results[results["timestamp"] == timestamp]
+    print(latest.pivot_table(index=["T", "D", "K"], columns="stage", values="seconds", sort=False)
+          .to_string(float_format=lambda v: f"{v:.3g}"))
+    print(f"Appended {len(latest)} results for {label} to: {args.results}")
+
+
+if __name__ == "__main__":
+    main()
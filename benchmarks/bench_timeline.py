@@ -0,0 +1,86 @@
+import matplotlib
+matplotlib.use("Agg")
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from regime_timeline import encode, slice_timeline, draw_spans, draw_steps
+
+colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728']
+
+
+# Sticky synthetic labels on an hourly index (long enough for 10^6 points)
+def synthetic_labels(n, n_regimes=4, stay=0.99, seed=0):
+    rng = np.random.default_rng(seed)
+    switch = rng.random(n) > stay
+    labels = np.cumsum(switch * rng.integers(1, n_regimes, size=n)) % n_regimes
+    return labels, pd.date_range("1990-01-01", periods=n, freq="h").to_numpy()
+
+
+# The segment loop plot.py used before regime_timeline: one axvspan per run
+def legacy_render(labels, dates, n_regimes=4):
+    fig, ax = plt.subplots(figsize=(20, 8))
+    ax.step(dates, labels, 'k-', where='post', linewidth=1.5)
+    for regime in range(n_regimes):
+        mask = labels == regime
+        if mask.any():
+            mask_array = mask.astype(int)
+            change_points = np.where(np.diff(mask_array) != 0)[0] + 1
+            segments = np.split(mask_array, change_points)
+            for i, segment in enumerate(segments):
+                if len(segment) > 0 and segment[0] == 1:
+                    start_idx = 0 if i == 0 else change_points[i - 1]
+                    end_idx = change_points[i] if i < len(change_points) else len(dates) - 1
+                    ax.axvspan(dates[start_idx], dates[end_idx], color=colors[regime], alpha=0.3)
+    fig.canvas.draw()
+    plt.close(fig)
+
+
+def timeline_render(labels, dates):
+    fig, ax = plt.subplots(figsize=(20, 8))
+    timeline = encode(labels, dates)
+    draw_steps(ax, timeline, color='k', linewidth=1.5)
+    draw_spans(ax, timeline, colors)
+    fig.canvas.draw()
+    plt.close(fig)
+    return timeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark regime_timeline rendering against the axvspan loop.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 500_000])
+    parser.add_argument("--legacy-max", type=int, default=100_000, help="largest size to run the legacy loop on")
+    args = parser.parse_args()
+
+    rows = []
+    for n in args.sizes:
+        labels, dates = synthetic_labels(n)
+        start = time.perf_counter()
+        timeline = timeline_render(labels, dates)
+        timeline_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(100):
+            slice_timeline(timeline, dates[n // 3], dates[n // 2])
+        slice_ms = (time.perf_counter() - start) * 10
+
+        legacy_seconds = np.nan
+        if n <= args.legacy_max:
+            start = time.perf_counter()
+            legacy_render(labels, dates)
+            legacy_seconds = time.perf_counter() - start
+        rows.append({"points": n, "runs": len(timeline["regime"]), "axvspan loop (s)": legacy_seconds,
+                     "timeline (s)": timeline_seconds, "speedup": legacy_seconds / timeline_seconds,
+                     "slice (ms)": slice_ms})
+    print(pd.DataFrame(rows).set_index("points").to_string(float_format=lambda v: f"{v:.3g}"))
+
+
+if __name__ == "__main__":
+    main()
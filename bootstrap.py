@@ -0,0 +1,202 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from backtest import target_weights, run_backtest, performance, load_probs
+from portfolio import RISK_FREE, load_returns, membership, regime_stats, regime_moments
+
+# === Bootstrap / simulation significance of regime strategies ===
+# Resampled histories are built as whole (paths, T, N) arrays and scored in
+# one batched backtest (backtest.run_backtest / performance):
+#   block      months are resampled in blocks (fixed-length circular
+#              "moving" blocks or geometric-length "stationary" blocks).
+#              Each month keeps its held weights next to its realised
+#              returns, so the signal-return link survives within a block.
+#   hmm        regime paths are simulated from the transition matrix of the
+#              run's labels. Returns are drawn from each regime's Gaussian
+#              (mean and covariance of the months in that regime), and the
+#              strategy holds the portfolio of the regime `lag` months earlier.
+# Paths are generated and scored in chunks sized to a fixed memory budget.
+# Each unit of SEED_UNIT paths gets its own child seed and chunks hold whole
+# units, so the results do not depend on the chunk size or the number of
+# workers. With a process pool, the inputs go to each worker once.
+
+STRATEGIES = ["Regime-Based", "Equal-Weighted"]
+METRICS = ["Annual Sharpe", "Annual Return", "Max Drawdown"]
+SEED_UNIT = 100
+
+# Set once per worker by init_worker
+_data = {}
+
+
+def init_worker(data):
+    _data.update(data)
+
+
+# (paths, T) month indices; a block starts at month t with probability 1/block ("stationary") or every `block` months
+def block_indices(T, n_paths, block, rng, method="stationary"):
+    if method == "stationary":
+        new_block = rng.random((n_paths, T)) < 1 / block
+    else:
+        new_block = np.broadcast_to(np.arange(T) % block == 0, (n_paths, T)).copy()
+    new_block[:, 0] = True
+    block_start = np.maximum.accumulate(np.where(new_block, np.arange(T), 0), axis=1)
+    starts = rng.integers(0, T, size=(n_paths, T))
+    return (np.take_along_axis(starts, block_start, axis=1) + np.arange(T) - block_start) % T
+
+
+# Markov chain with Gaussian returns per regime, fitted to labelled history
+def fit_regime_process(returns, labels, n_regimes):
+    counts = np.zeros((n_regimes, n_regimes))
+    np.add.at(counts, (labels[:-1], labels[1:]), 1)
+    empty = counts.sum(axis=1) == 0
+    counts[empty] = 1
+    # Regimes with too few months for a full-rank covariance use the pooled moments
+    mean, cov = regime_moments(regime_stats(returns, membership(labels, n_regimes)), min_count=returns.shape[1] + 1)
+    return {
+        "startprob": np.bincount(labels, minlength=n_regimes) / len(labels),
+        "transmat": counts / counts.sum(axis=1, keepdims=True),
+        "means": mean,
+        "chol": np.linalg.cholesky(cov + 1e-10 * np.eye(cov.shape[-1])),
+    }
+
+
+# (paths, T) regime paths and (paths, T, N) returns
+def simulate_regime_paths(process, T, n_paths, rng):
+    cumulative = np.cumsum(process["transmat"], axis=1)
+    states = np.empty((n_paths, T), dtype=int)
+    states[:, 0] = rng.choice(len(process["startprob"]), size=n_paths, p=process["startprob"])
+    draws = rng.random((n_paths, T))
+    for t in range(1, T):
+        states[:, t] = (draws[:, t, None] > cumulative[states[:, t - 1]]).sum(axis=1)
+    states = np.minimum(states, len(cumulative) - 1)
+    z = rng.standard_normal((n_paths, T, process["means"].shape[1]))
+    returns = process["means"][states] + (process["chol"][states] @ z[..., None])[..., 0]
+    return states, returns
+
+
+# (strategies, paths, T, N) held weights and (paths, T, N) returns for one chunk of paths
+def chunk_paths(n_paths, seed):
+    rng = np.random.default_rng(seed)
+    if _data["method"] == "hmm":
+        lag = _data["lag"]
+        states, returns = simulate_regime_paths(_data["process"], _data["T"] + lag, n_paths, rng)
+        regime = _data["tables"][0][states[:, :-lag or None]]
+        equal = np.broadcast_to(_data["tables"][1][0], regime.shape)
+        return np.stack([regime, equal]), returns[:, lag:]
+    idx = block_indices(_data["T"], n_paths, _data["block"], rng, _data["method"])
+    return _data["held"][:, idx], _data["returns"][idx]
+
+
+# {metric: (strategies, paths)} for one chunk of (n_paths, seed) units
+def evaluate_chunk(units):
+    paths = [chunk_paths(n, seed) for n, seed in units]
+    held = np.concatenate([p[0] for p in paths], axis=1)
+    returns = np.concatenate([p[1] for p in paths])
+    metrics = performance(run_backtest(held, returns, _data["cost"], lag=0), _data["risk_free"])
+    return {name: metrics[name] for name in METRICS}
+
+
+# Paths per chunk so that one chunk's arrays (weights, returns and backtest temporaries) fit the budget
+def chunk_size(T, n_assets, memory_mb, workers=1, n_strategies=len(STRATEGIES)):
+    bytes_per_path = 8 * T * n_assets * (4 * n_strategies + 2)
+    return max(1, int(memory_mb * 1024 ** 2 / workers // bytes_per_path))
+
+
+# Inputs shared by every chunk: held weights paired with the returns they earned, or the simulated regime process
+def prepare_inputs(probs, table, returns, labels=None, method="stationary", block=6, cost=0.001, lag=1,
+                   risk_free=RISK_FREE):
+    table = np.asarray(table, dtype=float)
+    equal = np.full_like(table, 1 / table.shape[1])
+    R = np.nan_to_num(np.asarray(returns, dtype=float))
+    data = {"method": method, "block": block, "cost": cost, "lag": lag, "risk_free": risk_free,
+            "T": len(R) - lag, "n_assets": table.shape[1]}
+    if method == "hmm":
+        data["process"] = fit_regime_process(R, np.asarray(labels), len(table))
+        data["tables"] = np.stack([table, equal])
+    else:
+        weights = np.stack([target_weights(probs, t) for t in (table, equal)])
+        data["held"] = weights[:, :len(R) - lag]
+        data["returns"] = R[lag:]
+    return data
+
+
+# {metric: (strategies, n_paths)} over all paths, chunked to the memory budget
+def bootstrap_metrics(data, n_paths=5000, seed=42, workers=1, memory_mb=256):
+    sizes = [min(SEED_UNIT, n_paths - start) for start in range(0, n_paths, SEED_UNIT)]
+    units = list(zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))))
+    per_chunk = max(1, chunk_size(data["T"], data["n_assets"], memory_mb, workers or os.cpu_count()) // SEED_UNIT)
+    chunks = [units[i:i + per_chunk] for i in range(0, len(units), per_chunk)]
+    if workers == 1:
+        init_worker(data)
+        chunks = [evaluate_chunk(c) for c in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(data,)) as pool:
+            chunks = list(pool.map(evaluate_chunk, chunks))
+    return {name: np.concatenate([c[name] for c in chunks], axis=1) for name in METRICS}
+
+
+# Observed value, percentile interval and one-sided p-value (uplift <= 0) per metric and strategy
+def summarize(observed, samples, confidence=0.95):
+    lower, upper = 100 * (1 - confidence) / 2, 100 * (1 + confidence) / 2
+    rows = []
+    for name in METRICS:
+        values = dict(zip(STRATEGIES, samples[name]))
+        values["Uplift"] = samples[name][0] - samples[name][1]
+        for strategy, v in values.items():
+            rows.append({"Metric": name, "Strategy": strategy, "Observed": observed[name][strategy],
+                         "Mean": v.mean(), "Lower": np.percentile(v, lower), "Upper": np.percentile(v, upper),
+                         "P(<= 0)": (v <= 0).mean() if strategy == "Uplift" else np.nan})
+    return pd.DataFrame(rows).set_index(["Metric", "Strategy"])
+
+
+def main():
+    from run_registry import connect, find_runs, load_frame, save_frame
+
+    parser = argparse.ArgumentParser(description="Bootstrap confidence intervals for a run's regime strategy.")
+    parser.add_argument("run_id")
+    parser.add_argument("--method", default="stationary", choices=["stationary", "moving", "hmm"])
+    parser.add_argument("--paths", type=int, default=5000)
+    parser.add_argument("--block", type=int, default=6, help="mean (stationary) or fixed (moving) block length")
+    parser.add_argument("--cost-bps", type=float, default=10.0)
+    parser.add_argument("--lag", type=int, default=1)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--memory-mb", type=float, default=256, help="budget for paths held at once")
+    parser.add_argument("--workers", type=int, default=1, help="process pool size (default: in-process)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    conn = connect()
+    n_regimes = int(find_runs(conn, run_id=args.run_id)["n_regimes"].iloc[0])
+    probs = load_probs(conn, args.run_id, n_regimes)
+    table = load_frame(conn, args.run_id, "mpt_weights_by_regime")
+    returns = load_returns()[table.columns].reindex(probs.index)
+    cost = args.cost_bps / 1e4
+
+    observed = {}
+    for strategy, t in zip(STRATEGIES, [table, np.full(table.shape, 1 / table.shape[1])]):
+        metrics = performance(run_backtest(target_weights(probs, t), returns, cost, args.lag))
+        for name in METRICS:
+            observed.setdefault(name, {})[strategy] = float(metrics[name])
+    for name in METRICS:
+        observed[name]["Uplift"] = observed[name]["Regime-Based"] - observed[name]["Equal-Weighted"]
+
+    data = prepare_inputs(probs, table, returns, probs.to_numpy().argmax(axis=1), args.method, args.block, cost,
+                          args.lag)
+    start = time.perf_counter()
+    samples = bootstrap_metrics(data, args.paths, args.seed, args.workers, args.memory_mb)
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(observed, samples, args.confidence)
+    # Execution settings travel with the intervals, so plots can say what they were computed at
+    summary["Lag"], summary["Cost bps"] = args.lag, args.cost_bps
+    save_frame(conn, args.run_id, "sharpe_bootstrap", summary.reset_index())
+    conn.close()
+    print(f"{args.paths} {args.method} paths in {elapsed:.2f}s")
+    print(summary.round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
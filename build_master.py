@@ -0,0 +1,63 @@
+import pandas as pd
+import os
+import glob
+import time
+import argparse
+
+# File paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CLEAN_DIR = os.path.join(BASE_DIR, "fred_series_clean")
+MASTER_CSV = os.path.join(BASE_DIR, "fred_master_dataset_2000_onwards.csv")
+START_DATE = "2000-01-01"
+
+
+# Single-column series are named after the file ("CPI (All Items)" -> "CPI_(All_Items)");
+# multi-column series get the file name as prefix ("AAA_Corporate_Bond_Yield_Bond_AAA_Yield")
+def column_names(stem, columns):
+    prefix = stem.replace(" ", "_")
+    if len(columns) == 1:
+        return [prefix]
+    return [f"{prefix}_{c.replace(' ', '_')}" for c in columns]
+
+
+def load_clean_series(clean_dir=CLEAN_DIR):
+    frames = []
+    for path in sorted(glob.glob(os.path.join(clean_dir, "*.csv"))):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        df = pd.read_csv(path, parse_dates=["Date"], index_col="Date")
+        df.columns = column_names(stem, df.columns)
+        frames.append(df.astype("float64"))
+    if not frames:
+        raise FileNotFoundError(f"No cleaned series found in {clean_dir}")
+    return frames
+
+
+# Outer-join every cleaned series on the month-end index in one concat
+def build_master(clean_dir=CLEAN_DIR, start=START_DATE):
+    master = pd.concat(load_clean_series(clean_dir), axis=1, join="outer").sort_index()
+    master.index.name = "Date"
+    return master.loc[start:]
+
+
+# Typed reads go through the feature store's "macro" panel, which is rebuilt from this CSV when it changes
+def save_master(master, csv_path=MASTER_CSV):
+    master.to_csv(csv_path)
+    return csv_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the monthly FRED master dataset from fred_series_clean/.")
+    parser.add_argument("--clean-dir", default=CLEAN_DIR)
+    parser.add_argument("--start", default=START_DATE)
+    parser.add_argument("--csv", default=MASTER_CSV)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    master = build_master(args.clean_dir, args.start)
+    path = save_master(master, args.csv)
+    print(f"Built master dataset {master.shape} in {time.perf_counter() - start:.2f}s")
+    print(f"Saved to: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+import pandas as pd
+import os
+import io
+import re
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# File paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RAW_DIR = os.path.join(BASE_DIR, "fred_series")
+CLEAN_DIR = os.path.join(BASE_DIR, "fred_series_clean")
+MANIFEST_NAME = ".manifest.json"
+
+# === Cleaning spec ===
+# method:     "align"    - monthly source, index moved to end-of-month
+#             "resample" - daily/weekly source collapsed to months with `agg`
+#             "release"  - quarterly source moved to quarter-end + `release_months`
+# rule:       target frequency, as an offset alias for resample/asfreq ("ME");
+#             its period alias ("M") is used for to_period
+# agg:        monthly aggregation for "resample" ("last" or "mean")
+# lag:        publication delay in rows, applied before gaps are filled
+# volatility: add a within-month standard deviation column ("resample" only)
+# asfreq:     reindex to a regular monthly grid ("align" only)
+# ffill:      forward-fill missing months
+# round:      decimals to round to, or None
+# columns:    output column names, or None to keep the raw ones
+DEFAULT_SPEC = {
+    "method": "align",
+    "rule": "ME",
+    "agg": "last",
+    "lag": 0,
+    "volatility": False,
+    "asfreq": True,
+    "ffill": True,
+    "round": None,
+    "columns": None,
+    "release_months": 3,
+}
+
+SERIES_SPECS = {
+    # Real-time market data
+    "10Y Treasury": {},
+    "2Y Treasury": {"asfreq": False},
+    "Fed Funds Rate": {},
+    "3M T-Bill": {"method": "resample"},
+    "5Y5Y Inflation Expectation": {"method": "resample", "volatility": True, "round": 3},
+    "AAA Corporate Bond Yield": {"method": "resample", "volatility": True, "round": 4,
+                                 "columns": ["Bond_AAA_Yield", "Bond_AAA_Yield_Volatility"]},
+    "BAA Corporate Bond Yield": {"method": "resample", "volatility": True, "round": 4,
+                                 "columns": ["Bond_BAA_Yield", "Bond_BAA_Yield_Volatility"]},
+    "High Yield Spread (ICE BofA)": {"method": "resample", "agg": "mean", "round": 2},
+    "TED Spread": {"method": "resample", "agg": "mean", "round": 2},
+    "Trade Weighted USD Index": {"method": "resample", "agg": "mean", "round": 2},
+    "Initial Jobless Claims": {"method": "resample", "agg": "mean", "round": -3},
+    # Survey released within the month
+    "Consumer Sentiment (UMich)": {},
+    # Monthly releases with a 1-month publication delay
+    "Building Permits": {"lag": 1},
+    "Capacity Utilization": {"lag": 1},
+    "CPI (All Items)": {"lag": 1},
+    "Core CPI": {"lag": 1},
+    "Housing Starts": {"lag": 1, "round": 0},
+    "Industrial Production Index": {"lag": 1, "round": 2},
+    "Leading Economic Index": {"lag": 1, "round": 2},
+    "Nonfarm Payrolls": {"lag": 1, "round": 0},
+    "PCE Price Index": {"lag": 1, "round": 3},
+    "PPI (All Commodities)": {"lag": 1, "round": 2},
+    "Retail Sales (Ex Auto)": {"lag": 1, "round": 0},
+    # Releases with a 2-month publication delay
+    "Exports (Goods & Services)": {"lag": 2},
+    "Imports (Goods & Services)": {"lag": 2, "round": 1},
+    "New Home Sales": {"lag": 2, "round": 0},
+    "Personal Consumption Expenditures": {"lag": 2, "round": 0},
+    # Quarterly national accounts, available ~3 months after quarter-end
+    "GDP Growth Rate": {"method": "release", "ffill": False, "round": 2},
+    "Real GDP": {"method": "release", "ffill": False, "round": 3},
+}
+
+
+def get_spec(name):
+    return {**DEFAULT_SPEC, **SERIES_SPECS[name]}
+
+
+# pandas >= 2.2 wants "ME"/"QE"/"YE" for offsets but still "M"/"Q"/"Y" for periods
+PERIOD_ALIASES = {"ME": "M", "QE": "Q", "YE": "Y"}
+
+
+def load_raw(path):
+    df = pd.read_csv(path, parse_dates=["Date"], index_col="Date")
+    return df.sort_index()
+
+
+# Apply one spec to a raw frame (same steps as the old clean_scripts/clean_*.py)
+def clean_frame(df, spec):
+    rule = spec["rule"]
+
+    if spec["method"] == "resample":
+        out = df.resample(rule).agg(spec["agg"])
+        if spec["volatility"]:
+            vol = df.resample(rule).std()
+            vol.columns = ["Volatility"]
+            out = pd.concat([out, vol], axis=1)
+        out = out.shift(spec["lag"]) if spec["lag"] else out
+    elif spec["method"] == "release":
+        out = df.copy()
+        out.index = out.index + pd.offsets.QuarterEnd(0) + pd.DateOffset(months=spec["release_months"])
+        out = out.shift(spec["lag"]) if spec["lag"] else out
+        out = out.resample(rule).ffill()
+    else:
+        out = df.copy()
+        period = PERIOD_ALIASES.get(rule, rule)
+        out.index = out.index.to_period(period).to_timestamp(period)
+        out = out.shift(spec["lag"]) if spec["lag"] else out
+        if spec["asfreq"]:
+            out = out.asfreq(rule)
+
+    if spec["ffill"]:
+        out = out.ffill()
+    if spec["round"] is not None:
+        out = out.round(spec["round"])
+    if spec["columns"]:
+        out.columns = spec["columns"]
+    return out
+
+
+def clean_series(name, raw_dir=RAW_DIR, clean_dir=CLEAN_DIR):
+    start = time.perf_counter()
+    df = load_raw(os.path.join(raw_dir, f"{name}.csv"))
+    df_cleaned = clean_frame(df, get_spec(name))
+
+    os.makedirs(clean_dir, exist_ok=True)
+    df_cleaned.to_csv(os.path.join(clean_dir, f"{name}.csv"))
+    return name, len(df_cleaned), time.perf_counter() - start
+
+
+def _clean_series_task(args):
+    return clean_series(*args)
+
+
+# Clean every series in one process pool (workers=1 runs in-process)
+def clean_all(names=None, workers=1, raw_dir=RAW_DIR, clean_dir=CLEAN_DIR):
+    names = list(names or SERIES_SPECS)
+    missing = [n for n in names if not os.path.exists(os.path.join(raw_dir, f"{n}.csv"))]
+    if missing:
+        raise FileNotFoundError(f"Raw series not found in {raw_dir}: {missing}")
+
+    tasks = [(name, raw_dir, clean_dir) for name in names]
+    if workers == 1:
+        return [_clean_series_task(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_clean_series_task, tasks))
+
+
+# === Incremental refresh ===
+# The manifest in fred_series_clean/ records, per raw file, its content hash,
+# last observation date and one checkpoint per calendar year: the byte offset
+# of that year's first row and the hash of everything before it. A refresh
+# finds the first year whose prefix changed, re-cleans from the year before
+# it (warm-up for lags and forward-fill) and rewrites the cleaned file from
+# that year onwards in place. Raw files are assumed to be sorted by date, as
+# FRED serves them.
+YEAR_ROW = re.compile(rb"^(\d{4})-", re.M)
+
+
+def load_manifest(clean_dir=CLEAN_DIR):
+    path = os.path.join(clean_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, clean_dir=CLEAN_DIR):
+    path = os.path.join(clean_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+# Year checkpoints for raw bytes, or None when rows are not in date order
+def scan_raw(data):
+    checkpoints = []
+    digest = hashlib.sha256()
+    last_pos, last_year = 0, None
+    for match in YEAR_ROW.finditer(data):
+        year = match.group(1).decode()
+        if year == last_year:
+            continue
+        if last_year is not None and year < last_year:
+            return None
+        digest.update(data[last_pos:match.start()])
+        checkpoints.append([year, match.start(), digest.hexdigest()])
+        last_pos, last_year = match.start(), year
+    return checkpoints
+
+
+def manifest_entry(name, data):
+    last_rows = data.rstrip().rsplit(b"\n", 1)
+    return {
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "size": len(data),
+        "last_date": last_rows[-1][:10].decode() if len(last_rows) > 1 else None,
+        "spec": get_spec(name),
+        "checkpoints": scan_raw(data),
+    }
+
+
+# Index of the first checkpoint whose prefix is unchanged and after which data differs
+def first_changed_checkpoint(old_checkpoints, new_checkpoints):
+    old = {year: digest for year, _, digest in old_checkpoints}
+    changed = None
+    for i, (year, _, digest) in enumerate(new_checkpoints):
+        if old.get(year) != digest:
+            break
+        changed = i
+    return changed
+
+
+def refresh_series(name, entry=None, raw_dir=RAW_DIR, clean_dir=CLEAN_DIR):
+    start = time.perf_counter()
+    raw_path = os.path.join(raw_dir, f"{name}.csv")
+    clean_path = os.path.join(clean_dir, f"{name}.csv")
+    with open(raw_path, "rb") as f:
+        data = f.read()
+    new_entry = manifest_entry(name, data)
+
+    if entry and os.path.exists(clean_path) and entry["spec"] == new_entry["spec"]:
+        if entry["sha256"] == new_entry["sha256"]:
+            return name, "unchanged", 0, time.perf_counter() - start, new_entry
+
+        changed = None
+        if entry["checkpoints"] and new_entry["checkpoints"]:
+            changed = first_changed_checkpoint(entry["checkpoints"], new_entry["checkpoints"])
+        if changed:
+            rows = _rewrite_tail(name, data, new_entry["checkpoints"], changed, clean_path)
+            if rows is not None:
+                return name, "incremental", rows, time.perf_counter() - start, new_entry
+
+    _, rows, _ = clean_series(name, raw_dir, clean_dir)
+    return name, "full", rows, time.perf_counter() - start, new_entry
+
+
+def _rewrite_tail(name, data, checkpoints, changed, clean_path):
+    spec = get_spec(name)
+    year = checkpoints[changed][0]
+    warmup_offset = checkpoints[changed - 1][1]
+    boundary = f"{year}-01-01"
+
+    # Re-clean raw rows from the warm-up year onwards
+    header = data[:data.index(b"\n") + 1]
+    df = pd.read_csv(io.BytesIO(header + data[warmup_offset:]), parse_dates=["Date"], index_col="Date")
+    new_rows = clean_frame(df.sort_index(), spec)
+    new_rows = new_rows[new_rows.index >= boundary]
+
+    # Locate the first cleaned row at or after the boundary
+    with open(clean_path, "rb") as f:
+        clean_data = f.read()
+    clean_header_end = clean_data.index(b"\n") + 1
+    cut, seed_start = len(clean_data), None
+    for match in re.finditer(rb"^(\d{4}-\d{2}-\d{2})", clean_data, re.M):
+        if match.group(1).decode() >= boundary:
+            cut = match.start()
+            break
+        seed_start = match.start()
+    if seed_start is None:
+        return None
+
+    # Fill leading gaps from the last unchanged cleaned row
+    seed = pd.read_csv(io.BytesIO(clean_data[:clean_header_end] + clean_data[seed_start:cut]),
+                       parse_dates=["Date"], index_col="Date")
+    if list(seed.columns) != list(new_rows.columns):
+        return None
+    new_rows = new_rows.astype({c: "float64" for c in seed.columns if seed[c].dtype.kind == "f"})
+    if spec["ffill"]:
+        new_rows = pd.concat([seed, new_rows]).ffill().iloc[len(seed):]
+
+    with open(clean_path, "r+b") as f:
+        f.truncate(cut)
+        f.seek(cut)
+        f.write(new_rows.to_csv(header=False).encode())
+    return len(new_rows)
+
+
+def refresh_all(names=None, raw_dir=RAW_DIR, clean_dir=CLEAN_DIR):
+    names = list(names or SERIES_SPECS)
+    manifest = load_manifest(clean_dir)
+    results = []
+    for name in names:
+        name, status, rows, seconds, entry = refresh_series(name, manifest.get(name), raw_dir, clean_dir)
+        manifest[name] = entry
+        results.append((name, status, rows, seconds))
+    save_manifest(manifest, clean_dir)
+    return results
+
+
+def update_manifest(names=None, raw_dir=RAW_DIR, clean_dir=CLEAN_DIR):
+    manifest = load_manifest(clean_dir)
+    for name in names or SERIES_SPECS:
+        with open(os.path.join(raw_dir, f"{name}.csv"), "rb") as f:
+            manifest[name] = manifest_entry(name, f.read())
+    save_manifest(manifest, clean_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean raw FRED series into monthly files.")
+    parser.add_argument("--series", nargs="+", help="series names (default: all in SERIES_SPECS)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="process pool size (default: in-process, faster for the ~30 small raw files)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only re-clean the tail of raw files that changed since the last run")
+    parser.add_argument("--raw-dir", default=RAW_DIR)
+    parser.add_argument("--clean-dir", default=CLEAN_DIR)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.incremental:
+        results = refresh_all(args.series, args.raw_dir, args.clean_dir)
+        for name, status, rows, seconds in results:
+            print(f"{name:<36} {status:<11} {rows:>6} rows  {seconds * 1000:7.1f} ms")
+    else:
+        results = clean_all(args.series, args.workers, args.raw_dir, args.clean_dir)
+        update_manifest(args.series, args.raw_dir, args.clean_dir)
+        for name, rows, seconds in results:
+            print(f"{name:<36} {rows:>6} rows  {seconds * 1000:7.1f} ms")
+    print(f"Saved {len(results)} cleaned series to: {args.clean_dir} ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
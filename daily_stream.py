@@ -0,0 +1,259 @@
+import pandas as pd
+import numpy as np
+import os
+import heapq
+import argparse
+from itertools import groupby
+from clean_fred import RAW_DIR, CLEAN_DIR, SERIES_SPECS, get_spec, load_manifest
+from build_master import column_names
+from online_filter import STATE_DIR, state_path, load_state, forward_step, update
+
+# === Daily regime signals from the raw FRED series ===
+# Raw rows are streamed through a chain of generators instead of re-cleaning
+# and resampling the full history each day:
+#   read_rows     chunked CSV reader per raw file, starting at the year
+#                 offset recorded in clean_fred's manifest when available
+#   merge_rows    date-ordered merge of every needed series
+#   panel_rows    running aligned panel: per series, the current month's
+#                 running last/mean/std (the same aggregation, lag, forward
+#                 fill and rounding as its clean_fred spec) plus the last
+#                 completed month; yields the month-to-date indicator vector
+#                 after each day, and the final vector when a month closes
+#   daily_signals each day's month-to-date vector gets a provisional
+#                 forward step from the last closed month, standardised with
+#                 the filter's scaler. Months closed since the filter's last
+#                 month are folded into a working copy only: lagged monthly
+#                 series (CPI, payrolls, IP) are not yet published when the
+#                 raw month ends, so the saved state is never advanced here.
+#                 Months are committed by the monthly `online_filter update`
+#                 from the cleaned master-dataset row.
+# Only WARMUP_MONTHS of raw history before the first open month are read, so
+# a daily run costs the same however long the history is.
+
+WARMUP_MONTHS = 12
+
+
+def _month(date):
+    return pd.Timestamp(date).to_period("M")
+
+
+# (date, series, value) rows of one raw file from `since` on
+def read_rows(name, since=None, raw_dir=RAW_DIR, clean_dir=CLEAN_DIR, chunksize=4096):
+    path = os.path.join(raw_dir, f"{name}.csv")
+    offset = 0
+    checkpoints = load_manifest(clean_dir).get(name, {}).get("checkpoints") or []
+    if since is not None:
+        for year, position, _ in checkpoints:
+            if int(year) <= since.year:
+                offset = position
+    with open(path, "rb") as f:
+        header = f.readline().decode().strip().split(",")
+        data_start = f.tell()
+        if offset:
+            # Only trust the manifest offset if it still points at the start of a dated row
+            f.seek(offset - 1)
+            if not f.read(5).decode(errors="ignore")[1:].isdigit():
+                offset = 0
+        f.seek(offset or data_start)
+        for chunk in pd.read_csv(f, names=header, parse_dates=["Date"], chunksize=chunksize):
+            if since is not None:
+                chunk = chunk[chunk["Date"] >= since]
+            for date, value in zip(chunk["Date"], chunk[header[1]].to_numpy(dtype=float)):
+                yield date, name, value
+
+
+def merge_rows(names, since=None, raw_dir=RAW_DIR):
+    return heapq.merge(*(read_rows(name, since, raw_dir) for name in names), key=lambda row: row[0])
+
+
+# Master-dataset column names produced by one raw series
+def series_columns(name, raw_dir=RAW_DIR):
+    spec = get_spec(name)
+    if spec["columns"]:
+        columns = spec["columns"]
+    else:
+        with open(os.path.join(raw_dir, f"{name}.csv")) as f:
+            columns = f.readline().strip().split(",")[1:]
+        if spec["method"] == "resample" and spec["volatility"]:
+            columns = columns + ["Volatility"]
+    return column_names(name, columns)
+
+
+# Panel state for the raw series behind `indicators`; raises if an indicator has no raw source
+def new_panel(indicators, names, raw_dir=RAW_DIR):
+    sources = {}
+    for name in names:
+        for i, column in enumerate(series_columns(name, raw_dir)):
+            sources[column] = (name, i)
+    missing = [c for c in indicators if c not in sources]
+    if missing:
+        raise ValueError(f"No raw series for indicators: {missing}")
+    used = sorted({sources[c][0] for c in indicators})
+    return {
+        "indicators": list(indicators),
+        "sources": [sources[c] for c in indicators],
+        "specs": {name: get_spec(name) for name in used},
+        "month": {name: None for name in used},        # month of the running aggregate
+        "running": {name: None for name in used},      # [count, last, mean, m2] for that month
+        "final": {name: None for name in used},        # values of the last completed month
+        "pending": {name: [] for name in used},        # (effective month, value) not yet in effect
+        "recent": {name: [] for name in used},         # raw values still held back by a row lag
+    }
+
+
+# Month a raw row's date maps to under its clean_fred spec. As in clean_frame,
+# "resample" lags move whole months while "align"/"release" lags move rows.
+def effective_month(date, spec):
+    if spec["method"] == "release":
+        return (pd.Timestamp(date) + pd.offsets.QuarterEnd(0)).to_period("M") + spec["release_months"]
+    if spec["method"] == "resample":
+        return _month(date) + spec["lag"]
+    return _month(date)
+
+
+def _round(values, spec):
+    return values if spec["round"] is None else np.round(values, spec["round"])
+
+
+def _close_month(panel, name):
+    panel["final"][name] = _running_values(panel["running"][name], panel["specs"][name], panel["final"][name])
+    panel["running"][name] = None
+
+
+def _running_values(running, spec, previous=None):
+    count, last, mean, m2 = running if running is not None else (0, np.nan, np.nan, 0.0)
+    values = [last if spec["agg"] == "last" else (mean if count else np.nan)]
+    if spec["volatility"]:
+        values.append(np.sqrt(m2 / (count - 1)) if count > 1 else np.nan)
+    values = np.array(values)
+    if spec["ffill"] and previous is not None:
+        values = np.where(np.isnan(values), previous, values)
+    return _round(values, spec)
+
+
+# Fold one raw row into the panel
+def add_row(panel, date, name, value):
+    spec = panel["specs"][name]
+    month = effective_month(date, spec)
+    if spec["method"] != "resample":
+        # A row's date carries the value from `lag` rows earlier
+        recent = panel["recent"][name]
+        recent.append(value)
+        if len(recent) > spec["lag"]:
+            panel["pending"][name].append((month, recent.pop(0)))
+        return
+    if panel["month"][name] is not None and month > panel["month"][name]:
+        _close_month(panel, name)
+    panel["month"][name] = month
+    if np.isnan(value):
+        return
+    # Welford update of the month's mean and squared deviations
+    count, _, mean, m2 = panel["running"][name] or (0, np.nan, 0.0, 0.0)
+    count += 1
+    delta = value - mean
+    mean += delta / count
+    panel["running"][name] = [count, value, mean, m2 + delta * (value - mean)]
+
+
+# Indicator vector for `month` from what the panel has seen so far
+def panel_vector(panel, month):
+    values = {}
+    for name, spec in panel["specs"].items():
+        if spec["method"] == "resample":
+            if panel["month"][name] is not None and panel["month"][name] < month:
+                _close_month(panel, name)
+                panel["month"][name] = month
+            values[name] = _running_values(panel["running"][name], spec, panel["final"][name])
+        else:
+            pending = panel["pending"][name]
+            while pending and pending[0][0] <= month:
+                value = np.array([pending.pop(0)[1]])
+                previous = panel["final"][name]
+                if spec["ffill"] and previous is not None:
+                    value = np.where(np.isnan(value), previous, value)
+                panel["final"][name] = _round(value, spec)
+            values[name] = panel["final"][name] if panel["final"][name] is not None else np.array([np.nan])
+    return np.array([values[name][i] for name, i in panel["sources"]])
+
+
+# (date, month, x, closed) per day: month-to-date vector, plus one closed=True row with the final vector of each month
+def panel_rows(panel, rows):
+    current = None
+    for date, day_rows in groupby(rows, key=lambda row: row[0]):
+        month = _month(date)
+        if current is not None and month > current:
+            yield date, current, panel_vector(panel, current), True
+        current = month
+        for row in day_rows:
+            add_row(panel, *row)
+        yield date, month, panel_vector(panel, month), False
+
+
+# (date, month, probabilities) per day after the filter's last month; `state` is left unchanged
+def daily_signals(state, rows):
+    provisional = dict(state)
+    last_month = None if state["last_date"] is None else _month(state["last_date"])
+    for date, month, x, closed in rows:
+        if last_month is not None and month <= last_month:
+            continue
+        if closed:
+            update(provisional, x, month.to_timestamp())
+            last_month = month
+            continue
+        log_alpha, _ = forward_step(provisional, x)
+        yield date, month, np.exp(log_alpha)
+
+
+def stream_signals(state, warmup_months=WARMUP_MONTHS, raw_dir=RAW_DIR):
+    names = [name for name in SERIES_SPECS if os.path.exists(os.path.join(raw_dir, f"{name}.csv"))]
+    panel = new_panel(state["indicators"], names, raw_dir)
+    first_open = _month(state["last_date"]) + 1 if state["last_date"] else None
+    since = None if first_open is None else (first_open - warmup_months).to_timestamp()
+    rows = merge_rows(list(panel["specs"]), since, raw_dir)
+    return daily_signals(state, panel_rows(panel, rows))
+
+
+# Date of the last row already written to a daily probabilities file
+def last_written_day(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        f.seek(max(0, os.path.getsize(path) - 4096))
+        lines = f.read().decode().strip().splitlines()
+    last = lines[-1].split(",")[0] if lines else ""
+    return pd.Timestamp(last) if last[:1].isdigit() else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Daily regime signals streamed from the raw FRED series.")
+    parser.add_argument("--regimes", type=int, default=4)
+    parser.add_argument("--state", default=None, help=f"filter state (default: {STATE_DIR}/online_filter_n<regimes>.npz)")
+    parser.add_argument("--warmup-months", type=int, default=WARMUP_MONTHS)
+    parser.add_argument("--raw-dir", default=RAW_DIR)
+    args = parser.parse_args()
+
+    path = args.state or state_path(args.regimes)
+    state = load_state(path)
+    n_regimes = len(state["startprob"])
+    probs_path = f"output/daily_regime_probs_n{n_regimes}.csv"
+    written = last_written_day(probs_path)
+
+    signals = [(d, m, p) for d, m, p in stream_signals(state, args.warmup_months, args.raw_dir)
+               if written is None or d > written]
+    print(f"Filter state closed through {state['last_date']} (months are committed by `online_filter.py update`)")
+    if not signals:
+        print("No new days")
+        return
+
+    probs = pd.DataFrame([p for _, _, p in signals], index=pd.Index([d for d, _, _ in signals], name="Date"),
+                         columns=[f"Regime_{i}" for i in range(n_regimes)])
+    probs.insert(0, "Month", [str(m) for _, m, _ in signals])
+    probs.insert(1, "Regime", probs.iloc[:, 1:].to_numpy().argmax(axis=1))
+    os.makedirs("output", exist_ok=True)
+    probs.to_csv(probs_path, mode="a", header=not os.path.exists(probs_path))
+    print(probs.tail(10).round(4).to_string())
+    print(f"Appended {len(probs)} day(s) to: {probs_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import numpy as np
+import os
+import json
+import time
+import argparse
+
+# File paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.path.join(BASE_DIR, "feature_store")
+
+# Panels kept in the store and the CSV each one is built from
+PANELS = {
+    "macro": "fred_master_dataset_2000_onwards.csv",
+    "etf_returns": "etf_monthly_returns_clean.csv",
+    "sector_prices": os.path.join("sector_data", "sector_adj_close_monthly_proxied.csv"),
+}
+
+# === Layout ===
+# <name>.values.npy  2-D float array (rows = dates, columns = catalog order)
+# <name>.dates.npy   datetime64[ns] index
+# <name>.json        catalog: columns, dtype, shape and the source file's mtime
+# Reading a fresh panel (open_panel) needs only NumPy; pandas is imported
+# when a panel is (re)built from its CSV or wrapped in a DataFrame.
+
+
+def _paths(name, store_dir):
+    base = os.path.join(store_dir, name)
+    return f"{base}.values.npy", f"{base}.dates.npy", f"{base}.json"
+
+
+def save_panel(name, df, dtype="float64", store_dir=STORE_DIR, source=None):
+    values_path, dates_path, catalog_path = _paths(name, store_dir)
+    os.makedirs(store_dir, exist_ok=True)
+
+    np.save(values_path, np.ascontiguousarray(df.to_numpy(dtype=dtype)))
+    np.save(dates_path, df.index.to_numpy(dtype="datetime64[ns]"))
+    catalog = {
+        "columns": [str(c) for c in df.columns],
+        "index_name": df.index.name,
+        "dtype": np.dtype(dtype).name,
+        "shape": list(df.shape),
+        "source": source,
+        "source_mtime": os.path.getmtime(source) if source else None,
+    }
+    with open(catalog_path, "w") as f:
+        json.dump(catalog, f, indent=1)
+    return catalog
+
+
+def read_catalog(name, store_dir=STORE_DIR):
+    with open(_paths(name, store_dir)[2]) as f:
+        return json.load(f)
+
+
+# Memory-map a stored panel: returns (dates, values, catalog) without copying
+def open_panel(name, store_dir=STORE_DIR):
+    values_path, dates_path, _ = _paths(name, store_dir)
+    catalog = read_catalog(name, store_dir)
+    values = np.load(values_path, mmap_mode="r")
+    dates = np.load(dates_path, mmap_mode="r")
+    return dates, values, catalog
+
+
+def is_fresh(name, store_dir=STORE_DIR, dtype=None):
+    if not os.path.exists(_paths(name, store_dir)[2]):
+        return False
+    catalog = read_catalog(name, store_dir)
+    if dtype is not None and catalog["dtype"] != np.dtype(dtype).name:
+        return False
+    source = catalog["source"]
+    return source is None or (os.path.exists(source) and os.path.getmtime(source) == catalog["source_mtime"])
+
+
+def build_panel(name, dtype="float64", store_dir=STORE_DIR):
+    import pandas as pd
+
+    source = os.path.join(BASE_DIR, PANELS[name])
+    df = pd.read_csv(source, parse_dates=["Date"], index_col="Date")
+    return save_panel(name, df, dtype, store_dir, source)
+
+
+# Rebuild the panel from its CSV if it is missing or stale
+def refresh_panel(name, dtype=None, store_dir=STORE_DIR):
+    if not is_fresh(name, store_dir, dtype):
+        build_panel(name, dtype or "float64", store_dir)
+
+
+# DataFrame view over the memory-mapped arrays, (re)building the panel from its CSV if stale
+def load_panel(name, dtype=None, store_dir=STORE_DIR):
+    import pandas as pd
+
+    refresh_panel(name, dtype, store_dir)
+    dates, values, catalog = open_panel(name, store_dir)
+    index = pd.DatetimeIndex(dates, name=catalog["index_name"])
+    return pd.DataFrame(values, index=index, columns=catalog["columns"], copy=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the memory-mapped feature store from the panel CSVs.")
+    parser.add_argument("--panels", nargs="+", default=list(PANELS), choices=list(PANELS))
+    parser.add_argument("--dtype", default="float64", choices=["float64", "float32"])
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    args = parser.parse_args()
+
+    for name in args.panels:
+        start = time.perf_counter()
+        catalog = build_panel(name, args.dtype, args.store_dir)
+        print(f"{name:<14} {tuple(catalog['shape'])} {catalog['dtype']} ({time.perf_counter() - start:.3f}s)")
+    print(f"Saved feature store to: {args.store_dir}")
+
+
+if __name__ == "__main__":
+    main()
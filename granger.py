@@ -0,0 +1,139 @@
+import pandas as pd
+import numpy as np
+import os
+import argparse
+from datetime import datetime
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from scipy import stats
+
+# === Granger causality matrix ===
+# For every (indicator, sector) pair and lag L = 1..maxlag, the F-test of
+#   restricted:   sector_t ~ 1 + sector_{t-1..t-L}
+#   unrestricted: sector_t ~ 1 + sector_{t-1..t-L} + indicator_{t-1..t-L}
+# (statsmodels' grangercausalitytests ssr_ftest). Lagged design matrices are
+# built once per lag for all columns; the restricted fits are shared by every
+# indicator and the unrestricted fits for all pairs are solved as one stack
+# of least-squares problems (batched QR). A pair's p-value is its minimum
+# over lags.
+
+EXCLUDED_SECTORS = ["SPY"]
+
+
+# (N, T - lag, lag) matrix of lags 1..lag for each column of a (T, N) array
+def lag_matrix(values, lag):
+    T = len(values)
+    return np.stack([values[lag - k:T - k] for k in range(1, lag + 1)], axis=-1).swapaxes(0, 1)
+
+
+# Residual sum of squares of y on each design in a stack (..., n, p) x (..., n)
+def batched_rss(design, y):
+    q, _ = np.linalg.qr(design)
+    fitted = (q @ (np.swapaxes(q, -1, -2) @ y[..., None]))[..., 0]
+    return ((y - fitted) ** 2).sum(axis=-1)
+
+
+# (I, S) F-test p-values at one lag
+def pvalues_at_lag(lag, x, y):
+    n = len(y) - lag
+    ones = np.ones((n, 1))
+    y_lags = lag_matrix(y, lag)                                   # (S, n, L)
+    x_lags = lag_matrix(x, lag)                                   # (I, n, L)
+    target = y[lag:].T                                            # (S, n)
+
+    restricted = np.concatenate([np.broadcast_to(ones, (y.shape[1], n, 1)), y_lags], axis=2)
+    rss_r = batched_rss(restricted, target)                       # (S,)
+
+    I, S = x.shape[1], y.shape[1]
+    unrestricted = np.concatenate([
+        np.broadcast_to(restricted[None], (I, S, n, lag + 1)),
+        np.broadcast_to(x_lags[:, None], (I, S, n, lag)),
+    ], axis=3)
+    rss_u = batched_rss(unrestricted, np.broadcast_to(target, (I, S, n)))
+
+    df_denom = n - 2 * lag - 1
+    f_stat = (rss_r[None] - rss_u) / lag / (rss_u / df_denom)
+    return stats.f.sf(f_stat, lag, df_denom)
+
+
+# Returns (min-over-lags p-value DataFrame, (maxlag, I, S) array of per-lag p-values)
+def granger_matrix(indicators, sectors, maxlag=6, workers=1):
+    # Standardising does not change any RSS ratio but keeps the QR well conditioned
+    x = indicators.to_numpy(dtype=float)
+    y = sectors.to_numpy(dtype=float)
+    x = (x - x.mean(axis=0)) / x.std(axis=0)
+    y = (y - y.mean(axis=0)) / y.std(axis=0)
+
+    lags = range(1, maxlag + 1)
+    run = partial(pvalues_at_lag, x=x, y=y)
+    if workers == 1:
+        per_lag = [run(lag) for lag in lags]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            per_lag = list(pool.map(run, lags))
+    per_lag = np.stack(per_lag)
+    matrix = pd.DataFrame(per_lag.min(axis=0), index=indicators.columns, columns=sectors.columns)
+    return matrix, per_lag
+
+
+# Indicators ranked by the number of sectors they Granger-cause at `alpha`, then by mean p-value
+def top_indicators(matrix, n=15, alpha=0.05):
+    ranking = pd.DataFrame({"significant": (matrix < alpha).sum(axis=1), "mean_p": matrix.mean(axis=1)})
+    ranking = ranking.sort_values(["significant", "mean_p"], ascending=[False, True])
+    return list(ranking.index[:n])
+
+
+# Written to output/ by default: the tracked top_indicators_for_regime.py also holds the hand-picked
+# selected_indicators, so refresh it by copying the new list across
+def write_top_indicators(indicators, path=os.path.join("output", "top_indicators_for_regime.py")):
+    lines = ["# Auto-generated by granger.py", f"# Date: {datetime.now():%Y-%m-%d %H:%M:%S}", "", "top_indicators = ["]
+    lines += [f"    {name!r}," for name in indicators]
+    lines += ["]", ""]
+    with open(path, "w") as f:
+        f.write("\n".join(lines))
+
+
+# Macro levels and sector ETF returns on their common monthly index
+def load_granger_inputs():
+    from feature_store import load_panel
+
+    macro = load_panel("macro")
+    returns = load_panel("etf_returns")
+    macro.index = macro.index.to_period("M").to_timestamp()
+    returns.index = returns.index.to_period("M").to_timestamp()
+    common_index = macro.index.intersection(returns.index)
+    macro = macro.loc[common_index].ffill().bfill()
+    sectors = returns.loc[common_index].drop(columns=EXCLUDED_SECTORS, errors="ignore").dropna()
+    return macro.loc[sectors.index], sectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Granger causality p-values for every indicator-sector pair.")
+    parser.add_argument("--maxlag", type=int, default=6)
+    parser.add_argument("--top", type=int, default=15, help="number of indicators in the top list")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=1, help="process pool size over lags (default: in-process)")
+    parser.add_argument("--top-file", default=os.path.join("output", "top_indicators_for_regime.py"),
+                        help="where the ranked list is written (default keeps the tracked module untouched)")
+    parser.add_argument("--csv", action="store_true", help="also write the p-value matrix to output/")
+    args = parser.parse_args()
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs("output", exist_ok=True)
+
+    macro, sectors = load_granger_inputs()
+    matrix, _ = granger_matrix(macro, sectors, args.maxlag, args.workers)
+    saved = [args.top_file]
+    if args.csv:
+        saved.insert(0, f"output/granger_causality_matrix_{timestamp}.csv")
+        matrix.to_csv(saved[0])
+
+    top = top_indicators(matrix, args.top, args.alpha)
+    write_top_indicators(top, args.top_file)
+    print(f"{len(matrix)} indicators x {len(matrix.columns)} sectors, lags 1-{args.maxlag}")
+    print("Top indicators:", ", ".join(top))
+    print(f"Saved: {', '.join(saved)}")
+
+
+if __name__ == "__main__":
+    main()
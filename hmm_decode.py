@@ -0,0 +1,69 @@
+import numpy as np
+import hashlib
+from collections import OrderedDict
+from scipy.special import logsumexp
+from hmmlearn import _hmmc
+
+# === Single-pass decoding ===
+# model.predict() and model.predict_proba() each evaluate the Gaussian
+# emission densities and run their own pass over the sequence. decode()
+# evaluates the (T, K) emission log-likelihood matrix once and runs Viterbi,
+# forward and backward on it with hmmlearn's compiled routines. Emission
+# matrices are also kept in a small cache keyed on the model's emission
+# parameters and the data, so repeated decodes of the same sequence skip the
+# density evaluation entirely.
+
+CACHE_SIZE = 32
+_emission_cache = OrderedDict()
+
+
+def _cache_key(model, X):
+    digest = hashlib.sha1()
+    for array in (model.means_, model._covars_, X):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return model.covariance_type, X.shape, digest.hexdigest()
+
+
+def emission_log_likelihood(model, X, cache=True):
+    X = np.asarray(X, dtype=float)
+    if not cache:
+        return model._compute_log_likelihood(X)
+
+    key = _cache_key(model, X)
+    if key in _emission_cache:
+        _emission_cache.move_to_end(key)
+        return _emission_cache[key]
+    log_frameprob = model._compute_log_likelihood(X)
+    _emission_cache[key] = log_frameprob
+    if len(_emission_cache) > CACHE_SIZE:
+        _emission_cache.popitem(last=False)
+    return log_frameprob
+
+
+def clear_cache():
+    _emission_cache.clear()
+
+
+# Viterbi path, posteriors and per-step log-likelihoods from one emission matrix
+def decode(model, X, cache=True):
+    log_frameprob = emission_log_likelihood(model, X, cache)
+    startprob, transmat = model.startprob_, model.transmat_
+
+    viterbi_log_likelihood, states = _hmmc.viterbi(startprob, transmat, log_frameprob)
+    log_likelihood, fwdlattice = _hmmc.forward_log(startprob, transmat, log_frameprob)
+    bwdlattice = _hmmc.backward_log(startprob, transmat, log_frameprob)
+
+    log_posteriors = fwdlattice + bwdlattice
+    log_posteriors -= logsumexp(log_posteriors, axis=1, keepdims=True)
+
+    # log p(x_t | x_1..x_{t-1}) from the forward lattice
+    step_log_likelihood = np.diff(logsumexp(fwdlattice, axis=1), prepend=0.0)
+
+    return {
+        "states": states,
+        "posteriors": np.exp(log_posteriors),
+        "log_likelihood": log_likelihood,
+        "viterbi_log_likelihood": viterbi_log_likelihood,
+        "step_log_likelihood": step_log_likelihood,
+        "log_frameprob": log_frameprob,
+    }
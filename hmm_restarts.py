@@ -0,0 +1,130 @@
+import pandas as pd
+import numpy as np
+import time
+import logging
+from hmmlearn import hmm
+from concurrent.futures import ProcessPoolExecutor
+
+# === Multi-restart GaussianHMM fitting ===
+# Each restart is a GaussianHMM advanced in rounds: one fit() call of
+# `warmup`, then `check_every`, EM iterations (init_params="" after the
+# first call). Restarts are compared on model.score(X) after each round: the
+# monitor's history holds the E-step likelihood of the parameters *before*
+# the last M-step, so it lags the model by one iteration. A restart is
+# abandoned once its score trails the leader by more than `margin` nats per
+# observation *and* by more than `patience` times its gain over the last
+# round, i.e. it is behind and not closing the gap (its first round only
+# sets the rate). The rest continue until an EM step gains less than `tol`
+# (a drop is not convergence) or they hit `n_iter`. Initialisation costs
+# about five EM iterations per restart and cannot be pruned.
+
+# hmmlearn logs a warning whenever a single step lowers the likelihood
+logging.getLogger("hmmlearn.base").setLevel(logging.ERROR)
+
+
+def _new_model(n_regimes, covariance_type, seed, tol):
+    return hmm.GaussianHMM(n_components=n_regimes, covariance_type=covariance_type,
+                           n_iter=1, tol=tol, random_state=seed)
+
+
+def _converged(history, tol):
+    return len(history) > 1 and 0 <= history[-1] - history[-2] < tol
+
+
+# Advance one restart by up to `steps` EM iterations in a single fit() call and score it (runs in a worker
+# process). The monitor only keeps the last two likelihoods, so each one is captured as it is reported.
+def _advance(task):
+    model, X, steps, history, tol = task
+    start = time.perf_counter()
+    monitor, reported = model.monitor_, []
+
+    def report(log_prob):
+        reported.append(log_prob)
+        type(monitor).report(monitor, log_prob)
+
+    monitor.report = report
+    model.n_iter = monitor.n_iter = steps
+    try:
+        model.fit(X)
+    finally:
+        del monitor.report
+    model.init_params = ""
+    return model, history + reported, model.score(X), time.perf_counter() - start
+
+
+def fit_multi_restart(X, n_regimes, covariance_type="full", n_restarts=10, seed=42, n_iter=100,
+                      tol=1e-2, warmup=3, check_every=3, margin=0.05, patience=10, workers=None):
+    restarts = [
+        {"restart": i, "seed": seed + i, "model": _new_model(n_regimes, covariance_type, seed + i, tol),
+         "history": [], "score": None, "gain": np.inf, "status": "running", "seconds": 0.0}
+        for i in range(n_restarts)
+    ]
+
+    threshold = margin * len(X)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+    try:
+        while True:
+            active = [r for r in restarts if r["status"] == "running"]
+            if not active:
+                break
+
+            steps = warmup if not active[0]["history"] else check_every
+            tasks = [(r["model"], X, min(steps, n_iter - len(r["history"])), r["history"], tol) for r in active]
+            outputs = pool.map(_advance, tasks) if pool else map(_advance, tasks)
+            for r, (model, history, score, seconds) in zip(active, outputs):
+                r["gain"] = np.inf if r["score"] is None else score - r["score"]
+                r["model"], r["history"], r["score"] = model, history, score
+                r["seconds"] += seconds
+                if _converged(history, tol):
+                    r["status"] = "converged"
+                elif len(history) >= n_iter:
+                    r["status"] = "max_iter"
+
+            # Abandon restarts trailing the leader
+            leader = max(r["score"] for r in restarts if r["status"] != "abandoned")
+            for r in active:
+                gap = leader - r["score"]
+                if r["status"] == "running" and gap > threshold and gap > patience * r["gain"]:
+                    r["status"] = "abandoned"
+    finally:
+        if pool:
+            pool.shutdown()
+
+    finished = [r for r in restarts if r["status"] != "abandoned"]
+    best = max(finished, key=lambda r: r["score"])
+    best_model = best["model"]
+    best_model.n_iter = len(best["history"])
+    best_model.init_params = "stmc"
+
+    convergence_log = pd.DataFrame([
+        {"restart": r["restart"], "seed": r["seed"], "iteration": i + 1, "log_likelihood": ll,
+         "score": r["score"], "status": r["status"], "best": r is best}
+        for r in restarts for i, ll in enumerate(r["history"])
+    ])
+    return best_model, convergence_log
+
+
+# One row per restart: final score, iterations used and outcome
+def summarize_restarts(convergence_log):
+    summary = convergence_log.groupby("restart").agg(
+        seed=("seed", "first"), iterations=("iteration", "max"), score=("score", "first"),
+        status=("status", "first"), best=("best", "first"))
+    return summary.sort_values("score", ascending=False)
+
+
+# Whether the selected restart converged (the best model's own monitor only ever saw one-iteration fits)
+def best_converged(convergence_log):
+    return bool((convergence_log.loc[convergence_log["best"], "status"] == "converged").any())
+
+
+if __name__ == "__main__":
+    from regime_builder_702 import load_macro_window, split_and_scale
+
+    train_data, predict_data, train_scaled, predict_scaled, scaler = split_and_scale(load_macro_window())
+    for n_regimes in range(4, 9):
+        start = time.perf_counter()
+        model, log = fit_multi_restart(train_scaled, n_regimes, n_restarts=50, workers=1)
+        summary = summarize_restarts(log)
+        print(f"n={n_regimes}: best LL {model.score(train_scaled):.2f}, "
+              f"{log['iteration'].count()} EM iterations over {len(summary)} restarts "
+              f"({(summary['status'] == 'abandoned').sum()} abandoned) in {time.perf_counter() - start:.2f}s")
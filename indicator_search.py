@@ -0,0 +1,230 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+import logging
+import argparse
+from datetime import datetime
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from hmmlearn import hmm, _hmmc
+from regime_builder_702 import load_macro_window, split_and_scale, selected_indicators
+from hmm_decode import emission_log_likelihood
+
+# === Indicator subset search ===
+# Scores indicator subsets by fitting a GaussianHMM on the training months
+# and evaluating it on the held-out months:
+#   loglik  out-of-sample log-likelihood per month, minus that of a single
+#           Gaussian fitted to the same columns (so subsets of different
+#           sizes are comparable)
+#   sharpe  annualised Sharpe ratio of holding, each month, the sector with
+#           the best training-period return in the filtered regime
+# Every candidate is standardised once; StandardScaler works column by
+# column, so slicing the scaled matrix equals re-scaling each subset.
+# Candidates are scored in two stages: a short EM run (`prune_iter`
+# iterations) for every subset in a batch, then a full fit only for the best
+# `keep` fraction of the batch, so clearly worse subsets are pruned early.
+
+logging.getLogger("hmmlearn.base").setLevel(logging.ERROR)
+ENGINEERED = ["Yield_Curve_Slope", "IP_YoY", "Inflation_YoY"]
+
+# Set once per worker by init_worker
+_data = {}
+
+
+def candidate_indicators():
+    from feature_store import load_panel
+
+    return list(load_panel("macro").columns) + ENGINEERED
+
+
+# Scaled train/test matrices for all candidates, plus next-month sector returns
+def load_search_data(candidates, train_fraction=0.7):
+    from feature_store import load_panel
+
+    macro_window = load_macro_window(candidates)
+    train_data, predict_data, train_scaled, predict_scaled, scaler = split_and_scale(macro_window, train_fraction)
+
+    returns = load_panel("etf_returns")
+    returns.index = returns.index.to_period("M").to_timestamp()
+    returns = returns.drop(columns="SPY", errors="ignore").shift(-1).reindex(macro_window.index)
+    return {
+        "columns": list(macro_window.columns),
+        "train": train_scaled,
+        "test": predict_scaled,
+        "train_returns": returns.iloc[:len(train_data)].to_numpy(dtype=float),
+        "test_returns": returns.iloc[len(train_data):].to_numpy(dtype=float),
+    }
+
+
+def init_worker(data):
+    _data.update(data)
+
+
+def gaussian_log_likelihood(train, test):
+    mean = train.mean(axis=0)
+    cov = np.atleast_2d(np.cov(train.T)) + 1e-3 * np.eye(train.shape[1])
+    chol = np.linalg.cholesky(cov)
+    z = np.linalg.solve(chol, (test - mean).T)
+    log_det = 2 * np.log(np.diag(chol)).sum()
+    return -0.5 * (len(test) * (train.shape[1] * np.log(2 * np.pi) + log_det) + (z ** 2).sum())
+
+
+# Filtered (no look-ahead) regime of each month from the forward pass
+def filtered_states(model, X):
+    _, fwdlattice = _hmmc.forward_log(model.startprob_, model.transmat_, emission_log_likelihood(model, X, cache=False))
+    return fwdlattice.argmax(axis=1)
+
+
+def regime_sharpe(model, train, test, train_returns, test_returns):
+    train_states = filtered_states(model, train)
+    overall = np.nanmean(train_returns, axis=0)
+    best_sector = []
+    for k in range(model.n_components):
+        in_regime = train_returns[train_states == k]
+        mean = np.nanmean(in_regime, axis=0) if len(in_regime) else overall
+        best_sector.append(np.nanargmax(np.where(np.isnan(mean), overall, mean)))
+    best_sector = np.array(best_sector)
+
+    held = test_returns[np.arange(len(test)), best_sector[filtered_states(model, test)]]
+    held = held[~np.isnan(held)]
+    return np.sqrt(12) * held.mean() / held.std() if held.std() > 0 else 0.0
+
+
+def evaluate_subset(subset, n_iter, n_regimes=4, covariance_type="full", seed=42, metric="loglik"):
+    columns = [_data["columns"].index(c) for c in subset]
+    train, test = _data["train"][:, columns], _data["test"][:, columns]
+    model = hmm.GaussianHMM(n_components=n_regimes, covariance_type=covariance_type, n_iter=n_iter, random_state=seed)
+    try:
+        model.fit(train)
+        if metric == "sharpe":
+            score = regime_sharpe(model, train, test, _data["train_returns"], _data["test_returns"])
+        else:
+            score = (model.score(test) - gaussian_log_likelihood(train, test)) / len(test)
+    except (ValueError, np.linalg.LinAlgError):
+        score = -np.inf
+    return subset, score
+
+
+# Search state: fit settings, the worker pool (None = in-process) and every subset scored so far
+def new_search(pool=None, n_regimes=4, covariance_type="full", seed=42, metric="loglik", n_iter=100,
+               prune_iter=10, keep=0.5):
+    return {
+        "pool": pool,
+        "fit_args": dict(n_regimes=n_regimes, covariance_type=covariance_type, seed=seed, metric=metric),
+        "n_iter": n_iter,
+        "prune_iter": prune_iter,
+        "keep": keep,
+        "scores": {},
+        "log": [],
+    }
+
+
+def _evaluate_all(search, subsets, n_iter):
+    fn = partial(evaluate_subset, n_iter=n_iter, **search["fit_args"])
+    return dict(search["pool"].map(fn, subsets) if search["pool"] else map(fn, subsets))
+
+
+# Two-stage scoring of a batch of subsets; returns {subset: score}, pruned subsets scoring -inf
+def score_subsets(search, subsets, step=0):
+    subsets = list(dict.fromkeys(tuple(sorted(s)) for s in subsets))
+    todo = [s for s in subsets if s not in search["scores"]]
+    if todo:
+        quick = _evaluate_all(search, todo, search["prune_iter"])
+        ranked = sorted(todo, key=lambda s: quick[s], reverse=True)
+        survivors = [s for s in ranked[:max(1, int(np.ceil(len(ranked) * search["keep"])))] if np.isfinite(quick[s])]
+        full = _evaluate_all(search, survivors, search["n_iter"])
+        for s in todo:
+            search["scores"][s] = full.get(s, -np.inf)
+            search["log"].append({"step": step, "size": len(s), "indicators": ", ".join(s), "quick_score": quick[s],
+                                  "score": full.get(s, np.nan), "pruned": s not in full})
+    return {s: search["scores"][s] for s in subsets}
+
+
+def _best(scores):
+    return max(scores.items(), key=lambda item: item[1])
+
+
+# Greedy forward selection: add the best indicator while the score improves
+def forward_search(search, candidates, max_size=15, start=()):
+    current, best = tuple(sorted(start)), -np.inf
+    while len(current) < max_size:
+        subset, score = _best(score_subsets(search, [current + (c,) for c in candidates if c not in current],
+                                            step=len(current)))
+        if score <= best:
+            break
+        current, best = subset, score
+    return current, best
+
+
+# Greedy backward elimination: drop the indicator whose removal helps most while the score improves
+def backward_search(search, start, min_size=2):
+    current = tuple(sorted(start))
+    best = score_subsets(search, [current])[current]
+    while len(current) > min_size:
+        subset, score = _best(score_subsets(search, [tuple(c for c in current if c != drop) for drop in current],
+                                            step=len(current)))
+        if score <= best:
+            break
+        current, best = subset, score
+    return current, best
+
+
+def random_search(search, candidates, n_subsets=200, min_size=4, max_size=15, seed=42):
+    rng = np.random.default_rng(seed)
+    # Plain str names (rng.choice returns np.str_), so the printed list pastes back into Python
+    subsets = [tuple(str(c) for c in rng.choice(candidates, size=rng.integers(min_size, max_size + 1), replace=False))
+               for _ in range(n_subsets)]
+    return _best(score_subsets(search, subsets))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search indicator subsets for the regime model.")
+    parser.add_argument("strategy", choices=["forward", "backward", "random"])
+    parser.add_argument("--metric", default="loglik", choices=["loglik", "sharpe"])
+    parser.add_argument("--regimes", type=int, default=4)
+    parser.add_argument("--covariance-type", default="full", choices=["full", "diag", "tied", "spherical"])
+    parser.add_argument("--max-size", type=int, default=15)
+    parser.add_argument("--subsets", type=int, default=200, help="random strategy: number of subsets")
+    parser.add_argument("--prune-iter", type=int, default=10, help="EM iterations in the pruning stage")
+    parser.add_argument("--keep", type=float, default=0.5, help="fraction of each batch given a full fit")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--csv", action="store_true", help="also write the per-subset search log to output/")
+    args = parser.parse_args()
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    candidates = candidate_indicators()
+    data = load_search_data(candidates)
+
+    start = time.perf_counter()
+    pool = None
+    if args.workers == 1:
+        init_worker(data)
+    else:
+        # The scaled matrices are sent to each worker once, not with every task
+        pool = ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=(data,))
+    search = new_search(pool, args.regimes, args.covariance_type, args.seed, args.metric,
+                        prune_iter=args.prune_iter, keep=args.keep)
+    try:
+        if args.strategy == "forward":
+            best, score = forward_search(search, candidates, args.max_size)
+        elif args.strategy == "backward":
+            best, score = backward_search(search, selected_indicators)
+        else:
+            best, score = random_search(search, candidates, args.subsets, max_size=args.max_size, seed=args.seed)
+    finally:
+        if pool:
+            pool.shutdown()
+    log = pd.DataFrame(search["log"])
+    if args.csv:
+        os.makedirs("output", exist_ok=True)
+        log.to_csv(f"output/indicator_search_{args.strategy}_{args.metric}_{timestamp}.csv", index=False)
+
+    print(f"{len(log)} subsets evaluated ({int(log['pruned'].sum())} pruned early) in {time.perf_counter() - start:.1f}s")
+    print(f"Best {args.metric} score {score:.4f} with {len(best)} indicators:")
+    print("selected_indicators = [\n" + "".join(f"    {c!r},\n" for c in best) + "]")
+
+
+if __name__ == "__main__":
+    main()
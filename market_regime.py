@@ -0,0 +1,49 @@
+import sys
+import argparse
+import importlib
+
+# === Command-line entry point ===
+# One command per pipeline stage. Each subcommand imports its module only
+# when it runs and hands the remaining arguments to that module's own
+# parser, so `market_regime.py <command> --help` shows the module's options.
+# Nothing heavy is imported here: `update` (the scheduled monthly scoring)
+# loads only NumPy and the online filter, never pandas, SciPy,
+# scikit-learn, hmmlearn or matplotlib (see benchmarks/bench_startup.py).
+
+# command: (module, leading arguments for its parser, summary)
+COMMANDS = {
+    "clean": ("clean_fred", [], "clean raw FRED series into monthly files"),
+    "build": ("build_master", [], "build the monthly master dataset"),
+    "fit": ("regime_builder_702", [], "fit a sweep of regime models into the run registry"),
+    "update": ("online_filter", ["update"], "fold new master-dataset months into the online filter "
+                                            "(--init fits the filter, --daily streams the raw series)"),
+    "plot": ("plot", [], "poster figures for a sweep"),
+}
+
+
+# Module and argv for a command; update --init / --daily select the filter's other entry points
+def resolve(command, rest):
+    module, leading, _ = COMMANDS[command]
+    if command == "update" and "--daily" in rest:
+        return "daily_stream", [a for a in rest if a != "--daily"]
+    if command == "update" and "--init" in rest:
+        return module, ["init"] + [a for a in rest if a != "--init"]
+    return module, leading + rest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Market regime pipeline.",
+        epilog="\n".join(f"  {name:<8}{summary}" for name, (_, _, summary) in COMMANDS.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=list(COMMANDS))
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="arguments for the command (see <command> --help)")
+    args = parser.parse_args(argv)
+
+    module, rest = resolve(args.command, args.args)
+    sys.argv = [f"{sys.argv[0]} {args.command}"] + rest
+    importlib.import_module(module).main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import pandas as pd
+import numpy as np
+import os
+import io
+import json
+import zipfile
+import hashlib
+import argparse
+from hmmlearn import hmm
+
+# === Fitted-model cache ===
+# Content-addressed store of fitted GaussianHMMs: the key is a hash of the
+# training matrix and the fit hyperparameters, so any change to the master
+# dataset, the indicator set, the split or the settings misses the cache.
+# Each entry is one .npz holding the fitted parameters (startprob, transmat,
+# means, covars), the convergence monitor, the scaler state and, for
+# multi-restart fits, the restart log. Reads refresh an entry's mtime and
+# evict() drops least-recently-used entries until the cache fits max_bytes.
+
+CACHE_DIR = os.path.join("models", "cache")
+MAX_BYTES = 256 * 1024 ** 2
+
+
+def cache_key(X, **params):
+    X = np.ascontiguousarray(X, dtype=float)
+    digest = hashlib.sha256()
+    digest.update(json.dumps([X.shape, sorted(params.items())], default=str).encode())
+    digest.update(X.tobytes())
+    return digest.hexdigest()
+
+
+def entry_path(key, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f"{key}.npz")
+
+
+def save_model(key, model, scaler=None, restart_log=None, cache_dir=CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    monitor = model.monitor_
+    arrays = {
+        "n_regimes": model.n_components,
+        "covariance_type": model.covariance_type,
+        "seed": -1 if model.random_state is None else model.random_state,
+        "n_iter": model.n_iter,
+        "tol": model.tol,
+        "startprob": model.startprob_,
+        "transmat": model.transmat_,
+        "means": model.means_,
+        "covars": model._covars_,
+        "history": np.asarray(monitor.history, dtype=float),
+        "monitor_n_iter": monitor.n_iter,
+        "monitor_iter": monitor.iter,
+    }
+    if scaler is not None:
+        arrays["scaler_mean"], arrays["scaler_scale"] = scaler.mean_, scaler.scale_
+    if restart_log is not None:
+        arrays["restart_log"] = restart_log.to_json(orient="split")
+
+    # Write then rename, so concurrent workers never see a partial entry
+    path = entry_path(key, cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+# (model, scaler_state, restart_log) or None on a miss; scaler_state is (mean, scale) or None
+def load_model(key, cache_dir=CACHE_DIR):
+    path = entry_path(key, cache_dir)
+    try:
+        with np.load(path) as f:
+            entry = {k: f[k] for k in f.files}
+    except FileNotFoundError:
+        return None
+    except (zipfile.BadZipFile, EOFError, ValueError, OSError):
+        # Entries are renamed into place whole, so an unreadable one is damaged: drop it and refit
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return None
+    os.utime(path)
+
+    seed = int(entry["seed"])
+    model = hmm.GaussianHMM(n_components=int(entry["n_regimes"]), covariance_type=str(entry["covariance_type"]),
+                            n_iter=int(entry["n_iter"]), tol=float(entry["tol"]),
+                            random_state=None if seed < 0 else seed)
+    model.n_features = entry["means"].shape[1]
+    model.startprob_ = entry["startprob"]
+    model.transmat_ = entry["transmat"]
+    model.means_ = entry["means"]
+    model._covars_ = entry["covars"]
+    model.monitor_.history.extend(entry["history"].tolist())
+    model.monitor_.n_iter = int(entry["monitor_n_iter"])
+    model.monitor_.iter = int(entry["monitor_iter"])
+
+    scaler_state = (entry["scaler_mean"], entry["scaler_scale"]) if "scaler_mean" in entry else None
+    restart_log = pd.read_json(io.StringIO(str(entry["restart_log"])), orient="split") if "restart_log" in entry else None
+    return model, scaler_state, restart_log
+
+
+# Drop least-recently-used entries until the cache fits in max_bytes; returns the number removed
+def evict(max_bytes=MAX_BYTES, cache_dir=CACHE_DIR):
+    if not os.path.isdir(cache_dir):
+        return 0
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".npz"):
+            stat = os.stat(os.path.join(cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+    entries.sort()
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, name in entries:
+        if total <= max_bytes:
+            break
+        os.remove(os.path.join(cache_dir, name))
+        total -= size
+        removed += 1
+    return removed
+
+
+def cache_stats(cache_dir=CACHE_DIR):
+    if not os.path.isdir(cache_dir):
+        return 0, 0
+    sizes = [os.path.getsize(os.path.join(cache_dir, n)) for n in os.listdir(cache_dir) if n.endswith(".npz")]
+    return len(sizes), sum(sizes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or trim the fitted-model cache.")
+    parser.add_argument("command", choices=["stats", "evict", "clear"])
+    parser.add_argument("--max-mb", type=float, default=MAX_BYTES / 1024 ** 2)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    if args.command == "evict":
+        print(f"Evicted {evict(int(args.max_mb * 1024 ** 2), args.cache_dir)} entries")
+    elif args.command == "clear":
+        print(f"Evicted {evict(0, args.cache_dir)} entries")
+    count, size = cache_stats(args.cache_dir)
+    print(f"{count} cached models, {size / 1024 ** 2:.1f} MB in {args.cache_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import numpy as np
+import os
+import argparse
+
+# === Online regime filtering ===
+# A fitted GaussianHMM, its scaler and the last forward (alpha) vector are
+# persisted in one .npz file. Each new month is folded in with one forward
+# step: predict through the transition matrix (O(K^2)) and weight by the
+# emission density (O(K D^2) with cached Cholesky factors), so the monthly
+# update does not re-decode the history.
+# The update path needs only NumPy (the feature store is memory-mapped and
+# the probabilities are appended as plain CSV lines), so a scheduled monthly
+# run starts without importing pandas, SciPy, scikit-learn or hmmlearn.
+
+STATE_DIR = "models"
+LOG_2PI = np.log(2 * np.pi)
+MIN_COVAR = 1e-3
+
+
+def logsumexp(a, axis=None):
+    a_max = np.max(a, axis=axis, keepdims=True)
+    a_max = np.where(np.isfinite(a_max), a_max, 0)
+    out = np.log(np.sum(np.exp(a - a_max), axis=axis, keepdims=True)) + a_max
+    return np.squeeze(out, axis=axis)
+
+
+def _day(date):
+    return str(np.datetime64(date, "D"))
+
+
+def state_path(n_regimes, state_dir=STATE_DIR):
+    return os.path.join(state_dir, f"online_filter_n{n_regimes}.npz")
+
+
+# Lower Cholesky factor per component; like hmmlearn, a component with a
+# singular covariance is retried with min_covar added to the diagonal
+def cholesky_factors(covars, min_covar=MIN_COVAR):
+    chol = np.empty_like(covars)
+    for k, cv in enumerate(covars):
+        try:
+            chol[k] = np.linalg.cholesky(cv)
+        except np.linalg.LinAlgError:
+            chol[k] = np.linalg.cholesky(cv + min_covar * np.eye(len(cv)))
+    return chol
+
+
+# Cholesky factors and log-determinants used by every update
+def _emission_cache(state):
+    chol = cholesky_factors(state["covars"])
+    state["chol"] = chol
+    state["log_det"] = 2 * np.log(np.diagonal(chol, axis1=1, axis2=2)).sum(axis=1)
+    # Transitions EM drove to zero stay at -inf
+    with np.errstate(divide="ignore"):
+        state["log_transmat"] = np.log(state["transmat"])
+    return state
+
+
+def emission_log_likelihood(state, x_scaled):
+    diff = x_scaled[None, :] - state["means"]
+    z = np.linalg.solve(state["chol"], diff[:, :, None])[:, :, 0]
+    return -0.5 * (len(x_scaled) * LOG_2PI + state["log_det"] + (z ** 2).sum(axis=1))
+
+
+# Point the filter at a (re)fitted model and scaler, keeping its forward vector
+def set_params(state, model, scaler):
+    state.update({
+        "startprob": model.startprob_,
+        "transmat": model.transmat_,
+        "means": model.means_,
+        "covars": model.covars_,
+        "scaler_mean": scaler.mean_,
+        "scaler_scale": scaler.scale_,
+    })
+    return _emission_cache(state)
+
+
+def new_state(model, scaler, indicators):
+    state = {
+        "indicators": np.asarray(indicators),
+        "log_alpha": None,
+        "last_x": None,
+        "last_date": None,
+        "n_obs": 0,
+    }
+    return set_params(state, model, scaler)
+
+
+# One forward step from the state without changing it: (normalised log alpha, gap-filled x)
+def forward_step(state, x):
+    x = np.asarray(x, dtype=float)
+    if state["last_x"] is not None:
+        x = np.where(np.isnan(x), state["last_x"], x)
+    log_b = emission_log_likelihood(state, (x - state["scaler_mean"]) / state["scaler_scale"])
+
+    if state["log_alpha"] is None:
+        with np.errstate(divide="ignore"):
+            log_alpha = np.log(state["startprob"]) + log_b
+    else:
+        log_alpha = logsumexp(state["log_alpha"][:, None] + state["log_transmat"], axis=0) + log_b
+    return log_alpha - logsumexp(log_alpha), x
+
+
+# Fold one raw observation into the filter; returns regime probabilities
+def update(state, x, date=None):
+    log_alpha, x = forward_step(state, x)
+    state["log_alpha"] = log_alpha
+    state["last_x"] = x
+    state["last_date"] = None if date is None else _day(date)
+    state["n_obs"] += 1
+    return np.exp(log_alpha)
+
+
+def filter_history(state, X, dates):
+    return np.array([update(state, x, d) for x, d in zip(X, dates)])
+
+
+def save_state(state, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    keep = {k: v for k, v in state.items() if k not in ("chol", "log_det", "log_transmat")}
+    keep["last_date"] = keep["last_date"] or ""
+    np.savez(path, **keep)
+
+
+def load_state(path):
+    with np.load(path) as f:
+        state = {k: f[k] for k in f.files}
+    state["indicators"] = [str(c) for c in state["indicators"]]
+    state["last_date"] = str(state["last_date"]) or None
+    state["n_obs"] = int(state["n_obs"])
+    return _emission_cache(state)
+
+
+# Master-dataset rows newer than the filter state, read from the memory-mapped feature store
+def new_rows(state):
+    from feature_store import refresh_panel, open_panel
+
+    refresh_panel("macro")
+    dates, values, catalog = open_panel("macro")
+    months = dates.astype("datetime64[M]").astype("datetime64[D]")
+    start = 0 if state["last_date"] is None else months.searchsorted(np.datetime64(state["last_date"]), side="right")
+    columns = [catalog["columns"].index(c) for c in state["indicators"]]
+    return months[start:], np.asarray(values[start:, columns], dtype=float)
+
+
+# Append probability rows in the layout pandas writes (Date, Regime, Regime_<i>)
+def append_probs(path, dates, probs):
+    header = not os.path.exists(path)
+    with open(path, "a") as f:
+        if header:
+            f.write(",".join(["Date", "Regime"] + [f"Regime_{i}" for i in range(probs.shape[1])]) + "\n")
+        for d, p in zip(dates, probs):
+            f.write(",".join([_day(d), str(p.argmax())] + [repr(float(v)) for v in p]) + "\n")
+
+
+def cmd_init(args):
+    from hmmlearn import hmm
+    from sklearn.preprocessing import StandardScaler
+    from regime_builder_702 import load_macro_window, selected_indicators
+
+    macro_window = load_macro_window(end=None)
+    scaler = StandardScaler().fit(macro_window)
+    X = scaler.transform(macro_window)
+    model = hmm.GaussianHMM(n_components=args.regimes, covariance_type="full", n_iter=100, random_state=args.seed)
+    model.fit(X)
+
+    state = new_state(model, scaler, selected_indicators)
+    probs = filter_history(state, macro_window.to_numpy(dtype=float), macro_window.index)
+    path = args.state or state_path(args.regimes)
+    save_state(state, path)
+    print(f"Fitted n={args.regimes} on {len(X)} months to {state['last_date']}; latest probabilities {np.round(probs[-1], 3)}")
+    print(f"Saved filter state to: {path}")
+
+
+def cmd_update(args):
+    path = args.state or state_path(args.regimes)
+    state = load_state(path)
+    dates, X = new_rows(state)
+    if not len(X):
+        print(f"No rows after {state['last_date']}; nothing to update")
+        return
+
+    os.makedirs("output", exist_ok=True)
+    n_regimes = len(state["startprob"])
+    probs_path = f"output/online_regime_probs_n{n_regimes}.csv"
+    probs = filter_history(state, X, dates)
+    append_probs(probs_path, dates, probs)
+    save_state(state, path)
+    print(f"{'Date':<10}  Regime" + "".join(f"{f'Regime_{i}':>10}" for i in range(n_regimes)))
+    for d, p in zip(dates, probs):
+        print(f"{_day(d):<10}  {p.argmax():>6}" + "".join(f"{v:>10.4f}" for v in p))
+    print(f"Appended {len(probs)} month(s) to: {probs_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Persisted HMM with constant-time monthly regime updates.")
+    parser.add_argument("command", choices=["init", "update"])
+    parser.add_argument("--regimes", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--state", default=None, help="state file (default: models/online_filter_n<regimes>.npz)")
+    args = parser.parse_args()
+    if args.command == "init":
+        cmd_init(args)
+    else:
+        cmd_update(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import matplotlib
+matplotlib.use("Agg")
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -5,6 +8,11 @@ import matplotlib.dates as mdates
 from matplotlib.patches import Rectangle
 import seaborn as sns
 import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from run_registry import connect, latest_sweep, run_id_for, load_series, load_frame
+from regime_timeline import timeline_from_series, draw_spans, draw_steps
+from regime_analytics import sweep_analytics
 
 # Set plot style
 plt.style.use('seaborn-v0_8-whitegrid')
@@ -13,8 +21,9 @@ sns.set_context("poster")
 # Define a consistent color palette
 colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2']
 
-# File timestamp from your output
-timestamp = "20250425_211645"
+# Results come from the run registry (output/runs.sqlite); set sweep_id to
+# pin a sweep, otherwise the latest sweep with an n=4 run is used
+sweep_id = None
 
 # Output directory for new plots
 output_dir = "poster_plots"
@@ -33,62 +42,48 @@ events = {
 # Focus on n_regimes=4 which had the best performance
 n_regimes = 4
 
+
+# One table of the chosen sweep's n-regime run from the registry
+def load_run_table(name, n=n_regimes):
+    conn = connect()
+    run_id = run_id_for(conn, sweep_id or latest_sweep(conn, n_regimes), n)
+    df = load_series(conn, run_id) if name == "regimes" else load_frame(conn, run_id, name)
+    conn.close()
+    return df
+
+# Transition, duration and performance analytics of the sweep's runs (regime_analytics),
+# computed once in the parent and handed to each worker
+_analytics = {}
+
+def init_worker(analytics, sweep=None):
+    global sweep_id
+    sweep_id = sweep
+    _analytics.update(analytics)
+
+def run_analytics(n=n_regimes):
+    if n not in _analytics:
+        _analytics.update(sweep_analytics(sweep_id, range(4, 8)))
+    if n not in _analytics:
+        raise LookupError(f"No n={n} run with regime labels in sweep {sweep_id or '(latest)'}; "
+                          f"check `python run_registry.py list --regimes {n}`")
+    return _analytics[n]
+
 # 1. Create Regime Detection Visualization with economic events
 def create_regime_detection_viz():
     # Load regime data
-    test_regimes = pd.read_csv(f'rolling_pred_30pct_regime_n{n_regimes}_{timestamp}.csv', 
-                              parse_dates=['Date'], index_col='Date')
-    
-    # Load performance data to determine regime characteristics
-    performance = pd.read_csv(f'regime_performance_summary_n{n_regimes}_{timestamp}.csv', index_col='Regime')
-    
-    # Determine regime names based on performance characteristics
-    regime_names = {}
-    for regime in range(n_regimes):
-        if regime in performance.index:
-            mean_return = performance.loc[regime, 'mean']
-            std_dev = performance.loc[regime, 'std']
-            sharpe = performance.loc[regime, 'sharpe']
-            
-            if sharpe > 1.0:
-                regime_names[regime] = "Bull Market"
-            elif sharpe > 0.5:
-                regime_names[regime] = "Stable Growth"
-            elif sharpe > 0:
-                regime_names[regime] = "Moderate Growth"
-            elif mean_return > 0:
-                regime_names[regime] = "High Volatility"
-            elif mean_return < -0.01:
-                regime_names[regime] = "Crisis"
-            else:
-                regime_names[regime] = "Market Stress"
-        else:
-            regime_names[regime] = f"Regime {regime}"
+    test_regimes = load_run_table('regimes')
+    
+    # Regime names from the run's per-regime performance
+    regime_names = run_analytics()['labels']
     
     # Create visualization
     plt.figure(figsize=(20, 8))
     ax = plt.gca()
     
-    # Plot the regime
-    plt.step(test_regimes.index, test_regimes['Regime'], 'k-', where='post', linewidth=1.5)
-    
-    # Color the background based on regime
-    for regime in range(n_regimes):
-        mask = test_regimes['Regime'] == regime
-        if mask.any():
-            # Get contiguous segments
-            mask_array = mask.astype(int).values
-            change_points = np.where(np.diff(mask_array) != 0)[0] + 1
-            segments = np.split(mask.astype(int).values, change_points)
-            date_array = test_regimes.index.values
-            
-            for i, segment in enumerate(segments):
-                if len(segment) > 0 and segment[0] == 1:
-                    start_idx = 0 if i == 0 else change_points[i-1]
-                    end_idx = change_points[i] if i < len(change_points) else len(date_array) - 1
-                    if start_idx < len(date_array) and end_idx < len(date_array):
-                        plt.axvspan(date_array[start_idx], date_array[end_idx], 
-                                   color=colors[regime], alpha=0.3)
+    # Plot the regime and color the background, one artist each for all regime runs
+    timeline = timeline_from_series(test_regimes)
+    draw_steps(ax, timeline, color='k', linewidth=1.5)
+    draw_spans(ax, timeline, colors)
     
     # Add economic events
     for date, label in events.items():
@@ -98,7 +93,7 @@ def create_regime_detection_viz():
             plt.text(event_date, n_regimes + 0.1, label, rotation=90, fontsize=12, va='bottom')
     
     # Format the plot
-    plt.yticks(range(n_regimes), [f"{i}: {regime_names[i]}" for i in range(n_regimes)], fontsize=14)
+    plt.yticks(range(n_regimes), [regime_names[i] for i in range(n_regimes)], fontsize=14)
     plt.title(f'Market Regimes Identified by HMM (4-Regime Model)', fontsize=20)
     plt.ylabel('Regime', fontsize=16)
     plt.xlabel('Date', fontsize=16)
@@ -117,7 +112,7 @@ def create_regime_detection_viz():
 # 2. Create Performance Comparison Visualization
 def create_performance_comparison():
     # Load performance metrics
-    metrics = pd.read_csv(f'performance_metrics_n{n_regimes}_{timestamp}.csv', index_col=0)
+    metrics = load_run_table('performance_metrics')
     
     # Select key metrics to display
     key_metrics = ['Annual Return', 'Annual Volatility', 'Annual Sharpe', 'Max Drawdown', 'Win Rate']
@@ -140,7 +135,7 @@ def create_performance_comparison():
         axes[0].bar_label(container, fmt='%.2f', fontsize=12)
     
     # Portfolio returns comparison
-    returns = pd.read_csv(f'portfolio_returns_n{n_regimes}_{timestamp}.csv', parse_dates=['Date'], index_col='Date')
+    returns = load_run_table('portfolio_returns')
     cumulative_regime = (1 + returns['Regime_Portfolio']).cumprod()
     cumulative_equal = (1 + returns['Equal_Portfolio']).cumprod()
     
@@ -162,33 +157,10 @@ def create_performance_comparison():
 # 3. Create Portfolio Weights Visualization
 def create_portfolio_weights_viz():
     # Load portfolio weights
-    weights = pd.read_csv(f'mpt_weights_by_regime_n{n_regimes}_{timestamp}.csv', index_col='Regime')
-    
-    # Load performance for naming regimes
-    performance = pd.read_csv(f'regime_performance_summary_n{n_regimes}_{timestamp}.csv', index_col='Regime')
-    
-    # Determine regime names
-    regime_names = {}
-    for regime in weights.index:
-        if int(regime) in performance.index:
-            mean_return = performance.loc[int(regime), 'mean']
-            std_dev = performance.loc[int(regime), 'std']
-            sharpe = performance.loc[int(regime), 'sharpe']
-            
-            if sharpe > 1.0:
-                regime_names[regime] = f"{regime}: Bull Market"
-            elif sharpe > 0.5:
-                regime_names[regime] = f"{regime}: Stable Growth"
-            elif sharpe > 0:
-                regime_names[regime] = f"{regime}: Moderate Growth"
-            elif mean_return > 0:
-                regime_names[regime] = f"{regime}: High Volatility"
-            elif mean_return < -0.01:
-                regime_names[regime] = f"{regime}: Crisis"
-            else:
-                regime_names[regime] = f"{regime}: Market Stress"
-        else:
-            regime_names[regime] = f"Regime {regime}"
+    weights = load_run_table('mpt_weights_by_regime')
+    
+    # Regime names from the run's per-regime performance
+    regime_names = run_analytics()['labels']
     
     # Create plot
     plt.figure(figsize=(16, 10))
@@ -197,7 +169,7 @@ def create_portfolio_weights_viz():
     sns.heatmap(weights, cmap='YlGnBu', annot=True, fmt=".2f", linewidths=.5, cbar_kws={'label': 'Weight'})
     
     # Rename y-axis labels
-    plt.yticks(np.arange(len(weights.index)) + 0.5, [regime_names[r] for r in weights.index], fontsize=12)
+    plt.yticks(np.arange(len(weights.index)) + 0.5, [regime_names[int(r)] for r in weights.index], fontsize=12)
     
     # Format plot
     plt.title('Optimal Portfolio Weights by Regime', fontsize=18)
@@ -216,15 +188,17 @@ def create_sharpe_comparison_by_regime_count():
     # Loop through regime counts
     for n in range(4, 8):
         try:
-            metrics = pd.read_csv(f'performance_metrics_n{n}_{timestamp}.csv', index_col=0)
+            metrics = load_run_table('performance_metrics', n)
             sharpe_by_regime.append({
                 'Regime Count': n,
                 'Regime-Based Sharpe': metrics.loc['Annual Sharpe', 'Regime-Based'],
                 'Equal-Weighted Sharpe': metrics.loc['Annual Sharpe', 'Equal-Weighted'],
-                'Outperformance': metrics.loc['Annual Return', 'Regime-Based'] - metrics.loc['Annual Return', 'Equal-Weighted']
+                'Outperformance': metrics.loc['Annual Return', 'Regime-Based'] - metrics.loc['Annual Return', 'Equal-Weighted'],
+                'Uplift CI': sharpe_uplift_ci(n)
             })
-        except:
-            pass
+        except LookupError:
+            # No run, performance_metrics table or metric row for this regime count (KeyError is a LookupError)
+            continue
     
     # Create DataFrame
     sharpe_df = pd.DataFrame(sharpe_by_regime)
@@ -239,98 +213,101 @@ def create_sharpe_comparison_by_regime_count():
     plt.bar(x - width/2, sharpe_df['Regime-Based Sharpe'], width, label='Regime-Based Strategy', color=colors[0])
     plt.bar(x + width/2, sharpe_df['Equal-Weighted Sharpe'], width, label='Equal-Weighted Benchmark', color=colors[1])
     
-    # Add outperformance text
+    # Add outperformance text, with the bootstrap interval of the Sharpe uplift when bootstrap.py has been run.
+    # The bars are the legacy metrics (same-month execution, no costs); the interval is labelled with the
+    # lag and cost it was bootstrapped at, which can differ
     for i, row in sharpe_df.iterrows():
         outperf = row['Outperformance'] * 100
-        plt.text(row['Regime Count'], row['Regime-Based Sharpe'] + 0.05, 
-                f"{outperf:.2f}%", ha='center', fontsize=12, 
+        label = f"{outperf:.2f}%"
+        if row['Uplift CI'] is not None:
+            lower, upper, lag, cost_bps = row['Uplift CI']
+            label += f"\nΔSR [{lower:+.2f}, {upper:+.2f}]"
+            if lag is not None and pd.notna(lag):
+                label += f"\n(lag {int(lag)}, {cost_bps:g} bp)"
+        plt.text(row['Regime Count'], max(row['Regime-Based Sharpe'], row['Equal-Weighted Sharpe'], 0) + 0.05, 
+                label, ha='center', va='bottom', fontsize=12, 
                 color='green' if outperf > 0 else 'red')
     
     # Format plot
     plt.axhline(y=0, color='k', linestyle='--', alpha=0.3)
+    # Room above the bars for the labels, whatever the signs of the Sharpe ratios
+    sharpes = sharpe_df[['Regime-Based Sharpe', 'Equal-Weighted Sharpe']].to_numpy()
+    low, high = min(sharpes.min(), 0), max(sharpes.max(), 0)
+    span = (high - low) or 1.0
+    plt.ylim(low - 0.05 * span if low < 0 else 0, high + 0.25 * span)
     plt.title('Sharpe Ratio by Number of Regimes', fontsize=18)
     plt.xlabel('Number of Regimes', fontsize=14)
     plt.ylabel('Annualized Sharpe Ratio', fontsize=14)
     plt.legend(fontsize=12)
     plt.grid(True, alpha=0.3)
     plt.xticks(x)
+    if sharpe_df['Uplift CI'].notna().any():
+        plt.figtext(0.01, -0.02, 'Bars: lag 0, no costs. ΔSR: bootstrap interval of the Sharpe uplift '
+                    'at the lag and cost shown.', fontsize=11, ha='left')
     
     plt.tight_layout()
     plt.savefig(f'{output_dir}/sharpe_by_regime_count.png', dpi=300, bbox_inches='tight')
     plt.close()
 
+# Bootstrap interval (lower, upper) of the annual Sharpe uplift and the (lag, cost bps) it was computed at,
+# or None if bootstrap.py has not been run; tables saved before the settings were stored give (None, None)
+def sharpe_uplift_ci(n):
+    try:
+        bootstrap = load_run_table('sharpe_bootstrap', n).set_index(['Metric', 'Strategy'])
+    except LookupError:
+        return None
+    row = bootstrap.loc[('Annual Sharpe', 'Uplift')]
+    return row['Lower'], row['Upper'], row.get('Lag'), row.get('Cost bps')
+
 # 5. Create Transition Matrix Visualization
 def create_transition_matrix_viz():
-    # Load transition matrix data
-    try:
-        # If you have saved the transition matrix directly, load it
-        # Otherwise, we'll just use a placeholder for demo purposes
-        transitions = np.array([
-            [0.8, 0.1, 0.05, 0.05],
-            [0.1, 0.75, 0.1, 0.05],
-            [0.05, 0.15, 0.7, 0.1],
-            [0.05, 0.05, 0.2, 0.7]
-        ])
-        
-        # Alternatively, if you have the transitions from visualization files already generated
-        # You could rebuild it from your saved data
-    except:
-        # Placeholder transition matrix
-        transitions = np.array([
-            [0.8, 0.1, 0.05, 0.05],
-            [0.1, 0.75, 0.1, 0.05],
-            [0.05, 0.15, 0.7, 0.1],
-            [0.05, 0.05, 0.2, 0.7]
-        ])
-    
-    # Load performance for naming regimes
-    performance = pd.read_csv(f'regime_performance_summary_n{n_regimes}_{timestamp}.csv', index_col='Regime')
-    
-    # Determine regime names
-    regime_names = {}
-    for regime in range(n_regimes):
-        if regime in performance.index:
-            mean_return = performance.loc[regime, 'mean']
-            std_dev = performance.loc[regime, 'std']
-            sharpe = performance.loc[regime, 'sharpe']
-            
-            if sharpe > 1.0:
-                regime_names[regime] = f"{regime}: Bull Market"
-            elif sharpe > 0.5:
-                regime_names[regime] = f"{regime}: Stable Growth"
-            elif sharpe > 0:
-                regime_names[regime] = f"{regime}: Moderate Growth"
-            elif mean_return > 0:
-                regime_names[regime] = f"{regime}: High Volatility"
-            elif mean_return < -0.01:
-                regime_names[regime] = f"{regime}: Crisis"
-            else:
-                regime_names[regime] = f"{regime}: Market Stress"
-        else:
-            regime_names[regime] = f"Regime {regime}"
+    # Fitted (or posterior-estimated) and empirical transition matrices of the run
+    analytics = run_analytics()
+    regime_names = [analytics['labels'][i] for i in range(n_regimes)]
+    expected = analytics['durations']['Expected (Model)']
     
     # Create plot
-    plt.figure(figsize=(12, 10))
-    
-    # Create heatmap
-    sns.heatmap(transitions, annot=True, cmap="YlOrRd", fmt=".2f", linewidths=.5, 
-               xticklabels=[regime_names[i] for i in range(n_regimes)],
-               yticklabels=[regime_names[i] for i in range(n_regimes)])
-    
-    # Format plot
-    plt.title('Regime Transition Probabilities', fontsize=18)
-    plt.xlabel('To Regime', fontsize=14)
-    plt.ylabel('From Regime', fontsize=14)
+    fig, axes = plt.subplots(1, 2, figsize=(24, 10))
+    
+    # Create heatmaps, model on the left and decoded labels on the right
+    titles = {'model': 'Model', 'posteriors': 'Posterior-Weighted', 'labels': 'Label-Count (No Posteriors Stored)'}
+    for ax, transitions, title in [(axes[0], analytics['model'], titles[analytics['model_source']]),
+                                   (axes[1], analytics['empirical'], 'Decoded Labels')]:
+        sns.heatmap(transitions, annot=True, cmap="YlOrRd", fmt=".2f", linewidths=.5, vmin=0, vmax=1, ax=ax,
+                    xticklabels=range(n_regimes), yticklabels=regime_names)
+        ax.set_title(f'{title} Transition Probabilities', fontsize=18)
+        ax.set_xlabel('To Regime', fontsize=14)
+        ax.set_ylabel('From Regime', fontsize=14)
+    
+    # Expected duration of each regime (months) from the model's self-transitions; a self-transition of 1
+    # gives inf (absorbing), a regime with no transitions to estimate from gives NaN
+    def duration_label(name, d):
+        if np.isnan(d):
+            return f"{name} (not visited)"
+        return f"{name} (absorbing)" if np.isinf(d) else f"{name} (~{d:.1f} mo)"
+    axes[0].set_yticklabels([duration_label(name, d) for name, d in zip(regime_names, expected)], rotation=0)
     
     plt.tight_layout()
     plt.savefig(f'{output_dir}/enhanced_transition_matrix_n{n_regimes}.png', dpi=300, bbox_inches='tight')
     plt.close()
 
-# Execute all visualizations
-create_regime_detection_viz()
-create_performance_comparison()
-create_portfolio_weights_viz()
-create_sharpe_comparison_by_regime_count()
-create_transition_matrix_viz()
+# Execute all visualizations, one figure per worker process
+def main():
+    global sweep_id
+    parser = argparse.ArgumentParser(description="Poster figures for a regime sweep from the run registry.")
+    parser.add_argument("--sweep", default=sweep_id, help="sweep id (default: latest sweep with an n=4 run)")
+    args = parser.parse_args()
+    sweep_id = args.sweep
+
+    figures = [create_regime_detection_viz, create_performance_comparison, create_portfolio_weights_viz,
+               create_sharpe_comparison_by_regime_count, create_transition_matrix_viz]
+    analytics = sweep_analytics(sweep_id, range(4, 8))
+    with ProcessPoolExecutor(initializer=init_worker, initargs=(analytics, sweep_id)) as pool:
+        for future in [pool.submit(figure) for figure in figures]:
+            future.result()
+
+    print("Enhanced visualizations for poster created successfully in the 'poster_plots' directory.")
+
 
-print("Enhanced visualizations for poster created successfully in the 'poster_plots' directory.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import pandas as pd
+import numpy as np
+import os
+import argparse
+
+# === Regime-conditional mean-variance portfolios ===
+# Per-regime sufficient statistics (weight, sum, cross-product) come from one
+# grouped pass over the returns: a (T, K) membership matrix (one-hot labels
+# or regime probabilities) times the returns. Adding a month is a rank-one
+# update, so walk-forward re-optimisation never recomputes covariances from
+# the full history.
+# All K long-only, fully-invested problems (optionally with a per-asset cap)
+# are solved together by accelerated projected gradient on
+#   max  mu'w - (gamma / 2) w' Sigma w
+# for a grid of risk aversions gamma; "max_sharpe" keeps the grid point with
+# the best Sharpe ratio for each regime, "utility" uses one gamma.
+
+RISK_FREE = 0.015 / 12
+# Per-asset cap of the legacy mpt_weights_by_regime tables
+MAX_WEIGHT = 0.5
+GAMMAS = np.logspace(-1, 3, 41)
+
+
+def membership(labels, n_regimes):
+    labels = np.asarray(labels)
+    if labels.ndim == 2:
+        return labels.astype(float)
+    return (labels[:, None] == np.arange(n_regimes)).astype(float)
+
+
+# Sufficient statistics per regime from one pass: returns (T, N), membership (T, K)
+def regime_stats(returns, weights):
+    valid = ~np.isnan(returns).any(axis=1)
+    R, G = returns[valid], weights[valid]
+    return {
+        "count": G.sum(axis=0),
+        "sum": G.T @ R,
+        "cross": np.einsum("tk,ti,tj->kij", G, R, R, optimize=True),
+    }
+
+
+# Fold one month (return vector r, membership row g) into the statistics
+def update_stats(stats, r, g):
+    if np.isnan(r).any():
+        return stats
+    stats["count"] += g
+    stats["sum"] += g[:, None] * r
+    stats["cross"] += g[:, None, None] * np.outer(r, r)
+    return stats
+
+
+# (K, N) means and (K, N, N) covariances; regimes with < 2 months fall back to the pooled moments
+def regime_moments(stats, min_count=2):
+    count, total, cross = stats["count"], stats["sum"], stats["cross"]
+    pooled_count = count.sum()
+    pooled_mean = total.sum(axis=0) / pooled_count
+    pooled_cov = (cross.sum(axis=0) - pooled_count * np.outer(pooled_mean, pooled_mean)) / (pooled_count - 1)
+
+    ok = count >= min_count
+    safe = np.where(ok, count, 1)
+    mean = total / safe[:, None]
+    cov = (cross - safe[:, None, None] * mean[:, :, None] * mean[:, None, :]) / np.maximum(safe - 1, 1)[:, None, None]
+    mean[~ok] = pooled_mean
+    cov[~ok] = pooled_cov
+    return mean, cov
+
+
+# Euclidean projection of each row onto {0 <= w <= cap, sum(w) = 1}. The
+# projection is clip(v - tau, 0, cap) where sum(...) = 1; that sum is
+# piecewise linear in tau with breakpoints v and v - cap, so tau is found
+# exactly by evaluating it at every breakpoint and interpolating.
+def project_capped_simplex(v, cap=1.0):
+    breaks = np.sort(np.concatenate([v, v - cap], axis=-1), axis=-1)
+    total = np.clip(v[..., None, :] - breaks[..., :, None], 0, cap).sum(axis=-1)
+    j = np.clip((total >= 1).sum(axis=-1, keepdims=True) - 1, 0, breaks.shape[-1] - 2)
+    t0, t1 = np.take_along_axis(breaks, j, -1), np.take_along_axis(breaks, j + 1, -1)
+    f0, f1 = np.take_along_axis(total, j, -1), np.take_along_axis(total, j + 1, -1)
+    tau = t0 + (f0 - 1) * (t1 - t0) / np.where(f0 > f1, f0 - f1, 1)
+    return np.clip(v - tau, 0, cap)
+
+
+# Batched FISTA for max mu'w - gamma/2 w'Sigma w over the capped simplex; mean (..., N), cov (..., N, N)
+def solve_mean_variance(mean, cov, gamma, cap=1.0, n_iter=2000, tol=1e-8, w0=None):
+    gamma = np.asarray(gamma, dtype=float)[..., None]
+    step = 1 / (gamma[..., 0] * np.linalg.eigvalsh(cov)[..., -1] + 1e-12)[..., None]
+    w = np.full(mean.shape, 1 / mean.shape[-1]) if w0 is None else np.broadcast_to(w0, mean.shape).copy()
+    w = project_capped_simplex(w, cap)
+    z, t = w, np.ones(mean.shape[:-1] + (1,))
+    for _ in range(n_iter):
+        grad = mean - gamma * (cov @ z[..., None])[..., 0]
+        w_next = project_capped_simplex(z + step * grad, cap)
+        # Adaptive restart: drop the momentum of problems where it points uphill
+        restart = ((z - w_next) * (w_next - w)).sum(axis=-1, keepdims=True) > 0
+        t = np.where(restart, 1.0, t)
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        z = w_next + np.where(restart, 0.0, (t - 1) / t_next) * (w_next - w)
+        converged = np.abs(w_next - w).max() < tol
+        w, t = w_next, t_next
+        if converged:
+            break
+    return w
+
+
+def portfolio_stats(w, mean, cov, risk_free=RISK_FREE):
+    expected = (w * mean).sum(axis=-1)
+    volatility = np.sqrt(np.einsum("...i,...ij,...j->...", w, cov, w))
+    return expected, volatility, (expected - risk_free) / volatility
+
+
+# (K, N) weights for every regime at once. `warm` is an optional dict carried
+# between calls (walk-forward): it keeps the last solution of every problem
+# so the next month's solves start from it.
+def optimize_regimes(mean, cov, objective="max_sharpe", gamma=5.0, cap=1.0, risk_free=RISK_FREE, warm=None,
+                     zoom_rounds=4, zoom_points=9):
+    warm = {} if warm is None else warm
+    K = len(mean)
+    if objective == "utility":
+        warm["weights"] = solve_mean_variance(mean, cov, np.full(K, gamma), cap, w0=warm.get("weights"))
+        return warm["weights"]
+
+    # (G, K) log-gammas -> (G, K, N) frontier portfolios and their Sharpe ratios, all in one solve
+    def frontier(log_gamma, w_start=None):
+        G = len(log_gamma)
+        w = solve_mean_variance(np.broadcast_to(mean, (G,) + mean.shape), np.broadcast_to(cov, (G,) + cov.shape),
+                                np.exp(log_gamma), cap, w0=w_start)
+        return w, portfolio_stats(w, mean, cov, risk_free)[2]
+
+    # Coarse grid, then repeated finer grids around each regime's best point
+    log_gamma = np.broadcast_to(np.log(GAMMAS)[:, None], (len(GAMMAS), K))
+    spacing = np.log(GAMMAS[1] / GAMMAS[0])
+    w, sharpe = frontier(log_gamma, warm.get("grid"))
+    warm["grid"] = w
+    regimes = np.arange(K)
+    for _ in range(zoom_rounds):
+        best = sharpe.argmax(axis=0)
+        center, w_best = log_gamma[best, regimes], w[best, regimes]
+        log_gamma = center + np.linspace(-spacing, spacing, zoom_points)[:, None]
+        spacing *= 2 / (zoom_points - 1)
+        w, sharpe = frontier(log_gamma, w_best)
+    return w[sharpe.argmax(axis=0), regimes]
+
+
+# (T, K, N) weights known at the end of each month, from statistics updated one month at a time
+def walk_forward_weights(returns, labels, n_regimes, min_obs=24, **optimize_args):
+    G = membership(labels, n_regimes)
+    stats = regime_stats(returns[:min_obs], G[:min_obs])
+    weights = np.full((len(returns), n_regimes, returns.shape[1]), np.nan)
+    warm = {}
+    for t in range(min_obs - 1, len(returns)):
+        if t >= min_obs:
+            update_stats(stats, returns[t], G[t])
+        mean, cov = regime_moments(stats)
+        weights[t] = optimize_regimes(mean, cov, warm=warm, **optimize_args)
+    return weights
+
+
+def load_returns(exclude=("SPY",)):
+    from feature_store import load_panel
+
+    returns = load_panel("etf_returns")
+    returns.index = returns.index.to_period("M").to_timestamp()
+    return returns.drop(columns=list(exclude), errors="ignore")
+
+
+# Weights and stats tables in the layout of the mpt_*_by_regime files
+def regime_portfolios(labels, returns, n_regimes, objective="max_sharpe", cap=MAX_WEIGHT, risk_free=RISK_FREE):
+    R = returns.reindex(labels.index).to_numpy(dtype=float)
+    mean, cov = regime_moments(regime_stats(R, membership(labels.to_numpy(), n_regimes)))
+    w = optimize_regimes(mean, cov, objective, cap=cap, risk_free=risk_free)
+    expected, volatility, sharpe = portfolio_stats(w, mean, cov, risk_free)
+    weights = pd.DataFrame(w, index=pd.Index(range(n_regimes), name="Regime"), columns=returns.columns)
+    stats = pd.DataFrame({"Expected Return": expected, "Volatility": volatility, "Sharpe Ratio": sharpe})
+    return weights, stats
+
+
+def main():
+    from run_registry import connect, load_series, find_runs, save_frame
+
+    parser = argparse.ArgumentParser(description="Mean-variance portfolio per regime for a registered run.")
+    parser.add_argument("run_id")
+    parser.add_argument("--objective", default="max_sharpe", choices=["max_sharpe", "utility"])
+    parser.add_argument("--max-weight", type=float, default=MAX_WEIGHT,
+                        help="per-sector cap (default matches the legacy tables; 1 = uncapped)")
+    parser.add_argument("--risk-free", type=float, default=0.015, help="annual risk-free rate")
+    parser.add_argument("--csv", action="store_true", help="also write output/mpt_*_<run_id>.csv")
+    args = parser.parse_args()
+
+    conn = connect()
+    n_regimes = int(find_runs(conn, run_id=args.run_id)["n_regimes"].iloc[0])
+    labels = load_series(conn, args.run_id)["Regime"]
+    weights, stats = regime_portfolios(labels, load_returns(), n_regimes, args.objective, args.max_weight,
+                                       args.risk_free / 12)
+    save_frame(conn, args.run_id, "mpt_weights_by_regime", weights)
+    save_frame(conn, args.run_id, "mpt_portfolio_stats_by_regime", stats)
+    conn.close()
+
+    if args.csv:
+        os.makedirs("output", exist_ok=True)
+        weights.to_csv(f"output/mpt_weights_by_regime_{args.run_id}.csv")
+        stats.to_csv(f"output/mpt_portfolio_stats_by_regime_{args.run_id}.csv")
+    print(weights.round(3).to_string())
+    print(stats.round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
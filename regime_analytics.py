@@ -0,0 +1,203 @@
+import pandas as pd
+import numpy as np
+import argparse
+from run_registry import REGISTRY_PATH, connect, latest_sweep, run_id_for, load_series, load_frame
+from regime_timeline import encode
+from portfolio import membership, regime_stats
+
+# === Regime analytics from a run's labels and probabilities ===
+# One pass per run computes everything the figures need:
+#   empirical    transition frequencies of the decoded labels
+#   model        the fitted model's transition matrix (the run's
+#                "transition_matrix" table); runs recorded without one use the
+#                expected transitions of the posteriors, sum_t p_t p_{t+1}'
+#                (from the series, or the legacy "rolling_pred_30pct_probs"
+#                table), and runs with neither fall back to the label counts
+#                (model_source says which)
+#   durations    observed run lengths per regime (first and last runs are cut
+#                off by the sample), and the geometric distribution implied by
+#                each regime's self-transition probability
+#   performance  mean, std, count, monthly Sharpe and frequency of the run's
+#                regime portfolio returns (equal weight across assets when
+#                the run has no portfolio_returns table) per regime
+#   names        regime names from the performance (Sharpe thresholds)
+# Analytics of a sweep are cached per process, so every figure reuses them.
+
+MAX_DURATION = 24
+
+_cache = {}
+
+
+# (n, n) transition counts of a label sequence
+def transition_counts(labels, n_regimes):
+    labels = np.asarray(labels)
+    pairs = labels[:-1] * n_regimes + labels[1:]
+    return np.bincount(pairs, minlength=n_regimes * n_regimes).reshape(n_regimes, n_regimes).astype(float)
+
+
+# Row-normalised transitions; regimes never left stay NaN
+def normalize_rows(counts):
+    totals = counts.sum(axis=1, keepdims=True)
+    return np.divide(counts, totals, out=np.full_like(counts, np.nan), where=totals > 0)
+
+
+# Expected transition counts from (T, n) posteriors
+def posterior_transitions(probs):
+    probs = np.asarray(probs, dtype=float)
+    return probs[:-1].T @ probs[1:]
+
+
+# (n, max_duration) probability of staying exactly d = 1..max_duration steps
+def duration_pmf(transmat, max_duration=MAX_DURATION):
+    stay = np.nan_to_num(np.diag(transmat))[:, None]
+    d = np.arange(1, max_duration + 1)
+    return (1 - stay) * stay ** (d - 1)
+
+
+# One row per observed run, and a per-regime summary against the expected durations
+def duration_tables(labels, dates, empirical, model):
+    timeline = encode(labels, dates)
+    runs = pd.DataFrame({"Regime": timeline["regime"], "Start": timeline["start"], "Duration": timeline["duration"]})
+    n_regimes = len(model)
+    grouped = runs.groupby("Regime")["Duration"]
+    summary = pd.DataFrame({
+        "Runs": grouped.size(),
+        "Observed Mean": grouped.mean(),
+        "Observed Median": grouped.median(),
+        "Observed Max": grouped.max(),
+    }).reindex(range(n_regimes))
+    summary["Runs"] = summary["Runs"].fillna(0).astype(int)
+    with np.errstate(divide="ignore"):
+        summary["Expected (Empirical)"] = 1 / (1 - np.diag(empirical))
+        summary["Expected (Model)"] = 1 / (1 - np.diag(model))
+    summary.index.name = "Regime"
+    return runs, summary
+
+
+# Per-regime mean/std/count/sharpe/frequency, in the layout of regime_performance_summary
+def regime_performance(returns, labels, n_regimes):
+    R = np.asarray(returns, dtype=float)[:, None]
+    stats = regime_stats(R, membership(labels, n_regimes))
+    count = stats["count"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = stats["sum"][:, 0] / count
+        std = np.sqrt((stats["cross"][:, 0, 0] - count * mean ** 2) / (count - 1))
+        std[count < 2] = np.nan
+        performance = pd.DataFrame({"mean": mean, "std": std, "count": count.astype(int), "sharpe": mean / std,
+                                    "frequency": count / count.sum()})
+    return performance[performance["count"] > 0]
+
+
+def regime_name(mean_return, sharpe):
+    if sharpe > 1.0:
+        return "Bull Market"
+    if sharpe > 0.5:
+        return "Stable Growth"
+    if sharpe > 0:
+        return "Moderate Growth"
+    if mean_return > 0:
+        return "High Volatility"
+    if mean_return < -0.01:
+        return "Crisis"
+    return "Market Stress"
+
+
+# "<regime>: <name>" for regimes seen in the performance table, "Regime <regime>" otherwise
+def regime_labels(performance, n_regimes):
+    return {r: f"{r}: {regime_name(performance.loc[r, 'mean'], performance.loc[r, 'sharpe'])}"
+            if r in performance.index else f"Regime {r}" for r in range(n_regimes)}
+
+
+# Regime returns of a run: its regime portfolio if recorded, else equal weight across assets
+def run_returns(conn, run_id, dates):
+    try:
+        return load_frame(conn, run_id, "portfolio_returns")["Regime_Portfolio"].reindex(dates)
+    except LookupError:
+        from portfolio import load_returns
+
+        return load_returns().reindex(dates).mean(axis=1)
+
+
+# (T, n) posteriors of a run on the series dates, as backtest.load_probs finds them, or None if none are stored
+def run_probs(conn, run_id, series, n_regimes):
+    columns = [f"Regime_{i}" for i in range(n_regimes)]
+    if all(c in series for c in columns):
+        return series[columns].to_numpy(dtype=float)
+    try:
+        return load_frame(conn, run_id, "rolling_pred_30pct_probs")[columns].reindex(series.index).to_numpy(dtype=float)
+    except LookupError:
+        return None
+
+
+def run_analytics(conn, run_id, n_regimes):
+    series = load_series(conn, run_id)
+    if series.empty:
+        raise LookupError(f"Run {run_id} has no regime labels")
+    labels = series["Regime"].to_numpy()
+    probs = run_probs(conn, run_id, series, n_regimes)
+    empirical = normalize_rows(transition_counts(labels, n_regimes))
+    try:
+        model = load_frame(conn, run_id, "transition_matrix").to_numpy(dtype=float)
+        model_source = "model"
+    except LookupError:
+        if probs is not None:
+            model, model_source = normalize_rows(posterior_transitions(probs)), "posteriors"
+        else:
+            model, model_source = empirical, "labels"
+    runs, durations = duration_tables(labels, series.index.to_numpy(), empirical, model)
+    returns = run_returns(conn, run_id, series.index).to_numpy()
+    valid = ~np.isnan(returns)
+    performance = regime_performance(returns[valid], labels[valid], n_regimes)
+    return {
+        "run_id": run_id,
+        "n_regimes": n_regimes,
+        "empirical": empirical,
+        "model": model,
+        "model_source": model_source,
+        "runs": runs,
+        "durations": durations,
+        "duration_pmf": duration_pmf(model),
+        "performance": performance,
+        "labels": regime_labels(performance, n_regimes),
+    }
+
+
+# {n_regimes: analytics} for the sweep's runs, computed once per process
+def sweep_analytics(sweep_id=None, regime_counts=range(4, 8), registry=REGISTRY_PATH):
+    conn = connect(registry)
+    sweep_id = sweep_id or latest_sweep(conn, min(regime_counts))
+    key = (sweep_id, tuple(regime_counts), registry)
+    if key not in _cache:
+        analytics = {}
+        for n in regime_counts:
+            try:
+                analytics[n] = run_analytics(conn, run_id_for(conn, sweep_id, n), n)
+            except LookupError:
+                continue
+        _cache[key] = analytics
+    conn.close()
+    return _cache[key]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transition, duration and performance analytics of a sweep's runs.")
+    parser.add_argument("--sweep", default=None, help="sweep id (default: latest)")
+    parser.add_argument("--regimes", type=int, nargs="+", default=[4, 5, 6, 7])
+    args = parser.parse_args()
+
+    for n, analytics in sweep_analytics(args.sweep, args.regimes).items():
+        labels = [analytics["labels"][r] for r in range(n)]
+        print(f"=== {analytics['run_id']} ({n} regimes) ===")
+        print(f"Transition matrix ({analytics['model_source']}):")
+        print(pd.DataFrame(analytics["model"], index=labels, columns=range(n)).round(3).to_string())
+        print("Empirical transition matrix:")
+        print(pd.DataFrame(analytics["empirical"], index=labels, columns=range(n)).round(3).to_string())
+        print("Durations (months):")
+        print(analytics["durations"].round(2).to_string())
+        print("Performance:")
+        print(analytics["performance"].round(4).to_string())
+        print()
+
+
+if __name__ == "__main__":
+    main()
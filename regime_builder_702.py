@@ -1,24 +1,20 @@
 import pandas as pd
 import numpy as np
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
+import time
+import argparse
 from sklearn.preprocessing import StandardScaler
 from hmmlearn import hmm
 from datetime import datetime
-
-# === Setup ===
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-os.makedirs("output", exist_ok=True)
-
-# === Load data ===
-fred_data = pd.read_csv('fred_master_dataset_2000_onwards.csv', parse_dates=['Date'], index_col='Date')
-sector_returns = pd.read_csv('sector_returns_monthly.csv', parse_dates=['Date'], index_col='Date')
-
-# === Feature engineering ===
-fred_data['Yield_Curve_Slope'] = fred_data['10Y_Treasury'] - fred_data['2Y_Treasury']
-fred_data['IP_YoY'] = fred_data['Industrial_Production_Index'].pct_change(12)
-fred_data['Inflation_YoY'] = fred_data['CPI_(All_Items)'].pct_change(12)
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from feature_store import load_panel
+from hmm_restarts import fit_multi_restart, best_converged
+from hmm_decode import decode
+from batched_hmm import fit_batch
+from model_cache import cache_key, entry_path, load_model, save_model, evict
+from run_registry import REGISTRY_PATH, connect, register_run, save_series, save_frame, split_key
+import tracing
 
 selected_indicators = [
     'TED_Spread', '10Y_Treasury', 'Leading_Economic_Index', 'Initial_Jobless_Claims',
@@ -28,63 +24,241 @@ selected_indicators = [
     'PPI_(All_Commodities)', 'BAA_Corporate_Bond_Yield_Bond_BAA_Yield_Volatility'
 ]
 
-fred_data.index = fred_data.index.to_period('M').to_timestamp()
-sector_returns.index = sector_returns.index.to_period('M').to_timestamp()
-common_index = fred_data.index.intersection(sector_returns.index)
 
-macro_aligned = fred_data.loc[common_index, selected_indicators].copy()
-macro_aligned = macro_aligned.ffill().bfill()
+# === Load data ===
+def load_macro_window(indicators=selected_indicators, start="2000-07-01", end="2024-07-01"):
+    with tracing.span("read_macro_panel"):
+        fred_data = load_panel('macro')
+    with tracing.span("read_sector_csv"):
+        sector_returns = pd.read_csv('sector_returns_monthly.csv', parse_dates=['Date'], index_col='Date')
+
+    # === Feature engineering ===
+    with tracing.span("features"):
+        fred_data['Yield_Curve_Slope'] = fred_data['10Y_Treasury'] - fred_data['2Y_Treasury']
+        fred_data['IP_YoY'] = fred_data['Industrial_Production_Index'].pct_change(12)
+        fred_data['Inflation_YoY'] = fred_data['CPI_(All_Items)'].pct_change(12)
+
+    with tracing.span("align"):
+        fred_data.index = fred_data.index.to_period('M').to_timestamp()
+        sector_returns.index = sector_returns.index.to_period('M').to_timestamp()
+        common_index = fred_data.index.intersection(sector_returns.index)
+
+        macro_aligned = fred_data.loc[common_index, indicators].copy()
+        macro_aligned = macro_aligned.ffill().bfill()
+    return macro_aligned.loc[start:end]
+
 
 # === Define 70/30 split ===
-macro_window = macro_aligned.loc["2000-07-01":"2024-07-01"]
-total_months = len(macro_window)
-split_index = int(total_months * 0.7)
-
-train_data = macro_window.iloc[:split_index]
-predict_data = macro_window.iloc[split_index:]
-
-# Standardize using training scaler
-scaler = StandardScaler()
-train_scaled = scaler.fit_transform(train_data)
-predict_scaled = scaler.transform(predict_data)
-
-# === Loop through regime counts ===
-for n_regimes in range(4, 9):
-    model = hmm.GaussianHMM(n_components=n_regimes, covariance_type="full", n_iter=100, random_state=42)
-    model.fit(train_scaled)
-
-    # Predict only for the 30% test set
-    hidden_states = model.predict(predict_scaled)
-    regime_probs = model.predict_proba(predict_scaled)
-
-    # === Save regime sequence plot ===
-    regime_df = pd.DataFrame({"Date": predict_data.index, "Regime": hidden_states}).set_index("Date")
-    plt.figure(figsize=(12, 4))
-    plt.plot(regime_df.index, regime_df['Regime'], drawstyle='steps-post')
-    plt.title(f'HMM Predicted Regimes (2000-2024)\nTrained on first 70%, Predicted on last 30% (n={n_regimes})')
-    plt.xlabel("Date")
-    plt.ylabel("Regime")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(f'output/rolling_pred_30pct_regime_n{n_regimes}_{timestamp}.png')
-    plt.close()
-
-    # === Save regime probabilities plot ===
-    regime_probs_df = pd.DataFrame(regime_probs, index=predict_data.index, columns=[f'Regime_{i}' for i in range(n_regimes)])
-    plt.figure(figsize=(14, 6))
-    for i in range(n_regimes):
-        plt.plot(regime_probs_df.index, regime_probs_df[f'Regime_{i}'], label=f'Regime {i}')
-    plt.title(f'HMM Regime Probabilities (Predicted on last 30%) - n={n_regimes}')
-    plt.xlabel("Date")
-    plt.ylabel("Probability")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(f'output/rolling_pred_30pct_probs_n{n_regimes}_{timestamp}.png')
-    plt.close()
-
-    # === Save results to CSV ===
-    regime_df.to_csv(f'output/rolling_pred_30pct_regime_n{n_regimes}_{timestamp}.csv')
-    regime_probs_df.to_csv(f'output/rolling_pred_30pct_probs_n{n_regimes}_{timestamp}.csv')
-
-print("✅ HMM prediction on last 30% of data (with model trained on first 70%) completed and saved.") 
\ No newline at end of file
+def split_and_scale(macro_window, train_fraction=0.7):
+    split_index = int(len(macro_window) * train_fraction)
+    train_data = macro_window.iloc[:split_index]
+    predict_data = macro_window.iloc[split_index:]
+
+    # Standardize using training scaler
+    with tracing.span("standard_scaler"):
+        scaler = StandardScaler()
+        train_scaled = scaler.fit_transform(train_data)
+        predict_scaled = scaler.transform(predict_data)
+    return train_data, predict_data, train_scaled, predict_scaled, scaler
+
+
+def model_key(config, train_scaled, n_iter=100, restarts=1, engine="hmmlearn"):
+    n_regimes, covariance_type, seed = config
+    # Multi-restart entries selected under earlier ranking or pruning rules must not be reused
+    selection = {"selection": "score_patience"} if restarts > 1 else {}
+    return cache_key(train_scaled, n_regimes=n_regimes, covariance_type=covariance_type, seed=seed,
+                     n_iter=n_iter, restarts=restarts, engine=engine, **selection)
+
+
+# === Fit one configuration (runs in a worker process) ===
+# With trace=True the configuration's spans and EM iterations are returned as result["trace"]
+def fit_regime_model(config, train_scaled, predict_scaled, n_iter=100, restarts=1, model=None, fit_seconds=None,
+                     engine="hmmlearn", cache=True, scaler=None, trace=False, restart_workers=1):
+    n_regimes, covariance_type, seed = config
+    with tracing.recording(trace) as records, tracing.span("fit_config", n_regimes=n_regimes,
+                                                           covariance_type=covariance_type, seed=seed):
+        result = _fit_regime_model(config, train_scaled, predict_scaled, n_iter, restarts, model, fit_seconds,
+                                   engine, cache, scaler, restart_workers)
+    result["trace"] = records
+    return result
+
+
+def _fit_regime_model(config, train_scaled, predict_scaled, n_iter, restarts, model, fit_seconds, engine, cache,
+                      scaler, restart_workers=1):
+    n_regimes, covariance_type, seed = config
+    start = time.perf_counter()
+    restart_log = None
+    key = model_key(config, train_scaled, n_iter, restarts, engine) if cache else None
+    with tracing.span("cache_lookup"):
+        cached = load_model(key) if cache and model is None else None
+    if cached is not None:
+        model, _, restart_log = cached
+    elif model is not None:
+        # Already fitted by the batched engine
+        start -= fit_seconds
+    elif restarts > 1:
+        # Restarts are spread over `restart_workers` processes (per-iteration log in restart_log)
+        with tracing.span("fit_restarts", restarts=restarts, workers=restart_workers):
+            model, restart_log = fit_multi_restart(train_scaled, n_regimes, covariance_type, n_restarts=restarts,
+                                                   seed=seed, n_iter=n_iter, workers=restart_workers)
+    else:
+        model = hmm.GaussianHMM(n_components=n_regimes, covariance_type=covariance_type, n_iter=n_iter, random_state=seed)
+        with tracing.span("fit"), tracing.em_iterations(model):
+            model.fit(train_scaled)
+    if cache and cached is None:
+        with tracing.span("cache_save"):
+            save_model(key, model, scaler, restart_log)
+    fit_seconds = time.perf_counter() - start
+
+    # Predict only for the 30% test set (Viterbi path and posteriors from one emission pass)
+    with tracing.span("decode"):
+        decoded = decode(model, predict_scaled)
+    hidden_states = decoded["states"]
+    regime_probs = decoded["posteriors"]
+
+    return {
+        "n_regimes": n_regimes,
+        "covariance_type": covariance_type,
+        "seed": seed,
+        "hidden_states": hidden_states,
+        "regime_probs": regime_probs,
+        "transmat": model.transmat_,
+        "log_likelihood": _score(model, train_scaled),
+        "n_iter": model.n_iter if restart_log is not None else len(model.monitor_.history),
+        "converged": best_converged(restart_log) if restart_log is not None else model.monitor_.converged,
+        "cached": cached is not None,
+        "restart_log": restart_log,
+        "fit_seconds": fit_seconds,
+        "total_seconds": time.perf_counter() - start,
+    }
+
+
+def _score(model, X):
+    with tracing.span("score"):
+        return model.score(X)
+
+
+# Every configuration uses the same fixed seed, so results do not depend on
+# worker count or scheduling order. engine="batched" fits every configuration
+# in one batched_hmm stack in this process; fit time is split evenly.
+# With cache=True, configurations already in the model cache are not refitted.
+# With restarts > 1 the pool runs each configuration's restarts instead (there
+# are many more restarts than configurations), one configuration at a time.
+def run_sweep(train_scaled, predict_scaled, regime_counts=range(4, 9), covariance_types=("full",),
+              seed=42, n_iter=100, workers=None, restarts=1, engine="hmmlearn", cache=True, scaler=None):
+    configs = [(n, cov, seed) for cov in covariance_types for n in regime_counts]
+    fit = partial(fit_regime_model, train_scaled=train_scaled, predict_scaled=predict_scaled, n_iter=n_iter,
+                  restarts=restarts, engine=engine, cache=cache, scaler=scaler, trace=tracing.enabled())
+    if engine == "batched":
+        pending = [c for c in configs
+                   if not (cache and os.path.exists(entry_path(model_key(c, train_scaled, n_iter, restarts, engine))))]
+        start = time.perf_counter()
+        with tracing.span("fit_batch", models=len(pending)):
+            models = dict(zip(pending, fit_batch(train_scaled, pending, n_iter))) if pending else {}
+        fit_seconds = (time.perf_counter() - start) / max(len(pending), 1)
+        return [fit(config, model=models.get(config), fit_seconds=fit_seconds) for config in configs]
+    if workers == 1 or restarts > 1:
+        return [fit(config, restart_workers=workers) for config in configs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fit, configs))
+
+
+def result_tag(result):
+    if result["covariance_type"] == "full":
+        return f"n{result['n_regimes']}"
+    return f"n{result['n_regimes']}_{result['covariance_type']}"
+
+
+# === Record one fitted configuration in the run registry (figures are rendered afterwards by render_plots) ===
+def save_results(conn, result, sweep_id, train_index, predict_index, indicators=selected_indicators, train_fraction=0.7):
+    run_id = f"{sweep_id}_{result_tag(result)}"
+    register_run(conn, run_id, sweep_id, result["n_regimes"], result["covariance_type"], result["seed"],
+                 indicators, split_key(train_fraction), train_index, predict_index, result["log_likelihood"],
+                 result["n_iter"], result["converged"], result["fit_seconds"])
+    save_series(conn, run_id, predict_index, result["hidden_states"], result["regime_probs"])
+    save_frame(conn, run_id, "transition_matrix", pd.DataFrame(result["transmat"]))
+    if result["restart_log"] is not None:
+        save_frame(conn, run_id, "restart_log", result["restart_log"])
+    return run_id
+
+
+def timing_report(results):
+    columns = ["n_regimes", "covariance_type", "seed", "n_iter", "converged", "cached", "log_likelihood", "fit_seconds",
+               "total_seconds"]
+    return pd.DataFrame([{c: r[c] for c in columns} for r in results])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit GaussianHMM regime models over a sweep of regime counts.")
+    parser.add_argument("--regimes", type=int, nargs="+", default=list(range(4, 9)))
+    parser.add_argument("--covariance-types", nargs="+", default=["full"],
+                        choices=["full", "diag", "tied", "spherical"])
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--n-iter", type=int, default=100)
+    parser.add_argument("--restarts", type=int, default=1,
+                        help="random initialisations per configuration; trailing restarts are abandoned early")
+    parser.add_argument("--engine", default="hmmlearn", choices=["hmmlearn", "batched"],
+                        help="batched: fit all configurations together with batched_hmm (no restarts)")
+    parser.add_argument("--no-plots", action="store_true",
+                        help="headless sweep: skip figures (render later with render_plots.py <sweep id>)")
+    parser.add_argument("--no-cache", action="store_true", help="refit every configuration, ignoring models/cache")
+    parser.add_argument("--trace", action="store_true",
+                        help="write per-stage timing, memory and EM iterations to output/trace_<sweep id>.json")
+    args = parser.parse_args()
+    if args.engine == "batched" and args.restarts > 1:
+        parser.error("--restarts is not supported with --engine batched")
+
+    # === Setup ===
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs("output", exist_ok=True)
+    if args.trace:
+        tracing.enable()
+
+    with tracing.span("load"):
+        macro_window = load_macro_window()
+    with tracing.span("split"):
+        train_data, predict_data, train_scaled, predict_scaled, scaler = split_and_scale(macro_window)
+
+    # === Fit all configurations, then write results ===
+    start = time.perf_counter()
+    with tracing.span("sweep", configs=len(args.regimes) * len(args.covariance_types), workers=args.workers):
+        results = run_sweep(train_scaled, predict_scaled, args.regimes, args.covariance_types, args.seed,
+                            args.n_iter, args.workers, args.restarts, args.engine, not args.no_cache, scaler)
+        for result in results:
+            tracing.extend(result.pop("trace"))
+    sweep_seconds = time.perf_counter() - start
+    with tracing.span("evict_cache"):
+        evict()
+
+    with tracing.span("save_results"):
+        conn = connect()
+        for result in results:
+            save_results(conn, result, timestamp, train_data.index, predict_data.index)
+        conn.close()
+
+    timing = timing_report(results)
+    print(timing.round(4).to_string(index=False))
+    print(f"Sweep wall time: {sweep_seconds:.2f}s (sum of fits: {timing['total_seconds'].sum():.2f}s)")
+
+    # === Render figures from the registry ===
+    if not args.no_plots:
+        from render_plots import render_all, sweep_tasks
+
+        start = time.perf_counter()
+        with tracing.span("render"):
+            paths = render_all(sweep_tasks(timestamp), args.workers)
+        print(f"Rendered {len(paths)} figures in {time.perf_counter() - start:.2f}s")
+
+    if args.trace:
+        path = tracing.write(f"output/trace_{timestamp}.json", tracing.disable(), sweep_id=timestamp,
+                             engine=args.engine, workers=args.workers, regimes=args.regimes,
+                             covariance_types=args.covariance_types, restarts=args.restarts)
+        print(f"Wrote trace to: {path}")
+
+    print(f"Recorded {len(results)} runs as sweep {timestamp} in: {REGISTRY_PATH}")
+    print("✅ HMM prediction on last 30% of data (with model trained on first 70%) completed and saved.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import numpy as np
+import matplotlib.dates as mdates
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import to_rgba
+
+# === Run-length encoded regime timeline ===
+# A label sequence is encoded once into its runs:
+#   start, end   dates spanned by the run (end = start of the next run; the
+#                last run ends one typical step after the last date)
+#   regime       label of the run
+#   duration     number of observations in the run
+#   first        index of the run's first observation
+# Slicing by date is two binary searches over the run starts/ends, and a
+# whole timeline is drawn as one PolyCollection of background spans plus one
+# step line with two vertices per run, however many observations it covers.
+
+
+def encode(labels, dates):
+    labels = np.asarray(labels)
+    dates = np.asarray(dates, dtype="datetime64[ns]")
+    first = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    step = np.median(np.diff(dates)) if len(dates) > 1 else np.timedelta64(1, "D")
+    starts = dates[first]
+    ends = np.r_[dates[first[1:]], dates[-1:] + step]
+    return {
+        "start": starts,
+        "end": ends,
+        "regime": labels[first],
+        "duration": np.diff(np.r_[first, len(labels)]),
+        "first": first,
+    }
+
+
+def timeline_from_series(series, column="Regime"):
+    return encode(series[column].to_numpy(), series.index.to_numpy())
+
+
+# Runs overlapping [start, end), with the first and last runs clipped to the range
+def slice_timeline(timeline, start=None, end=None):
+    lo = 0 if start is None else np.searchsorted(timeline["end"], np.datetime64(start, "ns"), side="right")
+    hi = len(timeline["start"]) if end is None else np.searchsorted(timeline["start"], np.datetime64(end, "ns"))
+    part = {k: v[lo:hi].copy() for k, v in timeline.items()}
+    if len(part["start"]):
+        if start is not None:
+            part["start"][0] = max(part["start"][0], np.datetime64(start, "ns"))
+        if end is not None:
+            part["end"][-1] = min(part["end"][-1], np.datetime64(end, "ns"))
+    return part
+
+
+# One PolyCollection of full-height spans coloured by regime
+def draw_spans(ax, timeline, colors, alpha=0.3, **kwargs):
+    x0 = mdates.date2num(timeline["start"])
+    x1 = mdates.date2num(timeline["end"])
+    verts = np.zeros((len(x0), 4, 2))
+    verts[:, :, 0] = np.stack([x0, x0, x1, x1], axis=1)
+    verts[:, :, 1] = [0, 1, 1, 0]
+    palette = np.array([to_rgba(c, alpha) for c in colors])
+    spans = PolyCollection(verts, facecolors=palette[timeline["regime"] % len(palette)], edgecolors="none",
+                           transform=ax.get_xaxis_transform(), **kwargs)
+    ax.add_collection(spans, autolim=False)
+    if len(x0):
+        ax.update_datalim([(x0.min(), 0), (x1.max(), 0)], updatey=False)
+        ax.autoscale_view(scaley=False)
+    return spans
+
+
+# Step line of the regime labels with two vertices per run
+def draw_steps(ax, timeline, **kwargs):
+    x = np.stack([timeline["start"], timeline["end"]], axis=1).ravel()
+    y = np.repeat(timeline["regime"], 2)
+    return ax.plot(x, y, **kwargs)[0]
@@ -0,0 +1,89 @@
+import matplotlib
+matplotlib.use("Agg")
+
+import os
+import argparse
+import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+from run_registry import REGISTRY_PATH, connect, find_runs, load_series
+
+# === Deferred figure rendering ===
+# The regime sweep only records its results in the run registry. Figures are
+# rendered afterwards from there, one figure per task in a process pool, so
+# model fitting never waits on PNG encoding and a headless sweep can skip
+# rendering altogether.
+
+
+def plot_regimes(series, png_path):
+    regime_df = series[['Regime']]
+    n_regimes = len(series.columns) - 1
+    plt.figure(figsize=(12, 4))
+    plt.plot(regime_df.index, regime_df['Regime'], drawstyle='steps-post')
+    plt.title(f'HMM Predicted Regimes (2000-2024)\nTrained on first 70%, Predicted on last 30% (n={n_regimes})')
+    plt.xlabel("Date")
+    plt.ylabel("Regime")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(png_path)
+    plt.close()
+
+
+def plot_probs(series, png_path):
+    regime_probs_df = series.drop(columns='Regime')
+    n_regimes = len(regime_probs_df.columns)
+    plt.figure(figsize=(14, 6))
+    for i in range(n_regimes):
+        plt.plot(regime_probs_df.index, regime_probs_df[f'Regime_{i}'], label=f'Regime {i}')
+    plt.title(f'HMM Regime Probabilities (Predicted on last 30%) - n={n_regimes}')
+    plt.xlabel("Date")
+    plt.ylabel("Probability")
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(png_path)
+    plt.close()
+
+
+PLOTTERS = {"regime": plot_regimes, "probs": plot_probs}
+
+
+# (kind, run_id, registry, png_path) for every run recorded under this sweep id
+def sweep_tasks(sweep_id, output_dir="output", registry=REGISTRY_PATH):
+    conn = connect(registry)
+    run_ids = find_runs(conn, sweep_id=sweep_id)["run_id"]
+    conn.close()
+    return [(kind, run_id, registry, f'{output_dir}/rolling_pred_30pct_{kind}_{run_id}.png')
+            for kind in PLOTTERS for run_id in sorted(run_ids)]
+
+
+def render_task(task):
+    kind, run_id, registry, png_path = task
+    conn = connect(registry)
+    series = load_series(conn, run_id)
+    conn.close()
+    PLOTTERS[kind](series, png_path)
+    return png_path
+
+
+def render_all(tasks, workers=None):
+    if workers == 1:
+        return [render_task(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render_task, tasks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render figures for a saved regime sweep.")
+    parser.add_argument("sweep_id", help="sweep id (the sweep's timestamp, e.g. 20250425_211645)")
+    parser.add_argument("--output-dir", default="output")
+    parser.add_argument("--registry", default=REGISTRY_PATH)
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    paths = render_all(sweep_tasks(args.sweep_id, args.output_dir, args.registry), args.workers)
+    print(f"Rendered {len(paths)} figures to: {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+import argparse
+from datetime import datetime
+from scipy import stats
+from granger import load_granger_inputs, top_indicators
+
+# === Rolling / expanding-window Granger causality ===
+# Same F-tests as granger.py, evaluated on every window ending at each month.
+# Each month t contributes one row
+#   v_t = [1, sector lags 1..maxlag, indicator lags 1..maxlag, sector_t]
+# and every regression in a window only needs the cross-product matrix
+# C = sum v_t v_t' over that window's rows. C is kept per lag (the lag-L
+# regressions drop the window's first L months, as statsmodels does) and
+# moved one month at a time by adding the new row's outer product and
+# subtracting the one that left the window, so no window is refitted from
+# the data. RSS for every pair then comes from batched solves on blocks of C.
+
+
+def row_vectors(x, y, maxlag):
+    T, I = x.shape
+    S = y.shape[1]
+    V = np.zeros((T, 1 + (S + I) * maxlag + S))
+    V[:, 0] = 1
+    for k in range(1, maxlag + 1):
+        V[k:, 1 + (k - 1):1 + S * maxlag:maxlag] = y[:-k]
+        V[k:, 1 + S * maxlag + (k - 1):1 + (S + I) * maxlag:maxlag] = x[:-k]
+    V[:, 1 + (S + I) * maxlag:] = y
+    return V
+
+
+# Column indices into v_t for the restricted (S, L + 1) and unrestricted (I, S, 2L + 1) designs at one lag
+def design_columns(lag, n_indicators, n_sectors, maxlag):
+    I, S = n_indicators, n_sectors
+    y_lags = 1 + np.arange(S)[:, None] * maxlag + np.arange(lag)
+    x_lags = 1 + S * maxlag + np.arange(I)[:, None] * maxlag + np.arange(lag)
+    restricted = np.concatenate([np.zeros((S, 1), dtype=int), y_lags], axis=1)
+    unrestricted = np.concatenate([np.broadcast_to(restricted[None], (I, S, lag + 1)),
+                                   np.broadcast_to(x_lags[:, None], (I, S, lag))], axis=2)
+    target = 1 + (S + I) * maxlag + np.arange(S)
+    return restricted, unrestricted, target
+
+
+# RSS of each sector's target on its designs (..., S, p), read off a cross-product matrix
+def rss_from_crossproducts(C, columns, target):
+    ZZ = C[columns[..., :, None], columns[..., None, :]]
+    Zy = C[columns, target[:, None]]
+    beta = np.linalg.solve(ZZ, Zy[..., None])[..., 0]
+    return C[target, target] - (beta * Zy).sum(axis=-1)
+
+
+# (W, I, S) minimum-over-lags p-values for windows ending at each month from
+# `min_obs` on; window=None gives an expanding window from the first month
+def rolling_granger(indicators, sectors, window=120, maxlag=6, min_obs=None):
+    x = indicators.to_numpy(dtype=float)
+    y = sectors.to_numpy(dtype=float)
+    # Fixed full-sample standardisation: F-statistics are invariant to it and it keeps C well scaled
+    x = (x - x.mean(axis=0)) / x.std(axis=0)
+    y = (y - y.mean(axis=0)) / y.std(axis=0)
+    V = row_vectors(x, y, maxlag)
+    T, I, S = len(V), x.shape[1], y.shape[1]
+
+    first_end = window if window else (min_obs or 4 * maxlag + 2)
+    lags = range(1, maxlag + 1)
+    designs = {lag: design_columns(lag, I, S, maxlag) for lag in lags}
+
+    # Cross-products of rows [start + lag, end) for each lag
+    start = first_end - window if window else 0
+    C = np.stack([V[start + lag:first_end].T @ V[start + lag:first_end] for lag in lags])
+
+    pvalues = np.empty((T - first_end + 1, I, S))
+    for w, end in enumerate(range(first_end, T + 1)):
+        if end > first_end:
+            new = np.outer(V[end - 1], V[end - 1])
+            C += new
+            if window:
+                for lag in lags:
+                    old = V[start + lag]
+                    C[lag - 1] -= np.outer(old, old)
+                start += 1
+
+        best = np.ones((I, S))
+        for lag in lags:
+            restricted, unrestricted, target = designs[lag]
+            n = end - start - lag
+            df_denom = n - 2 * lag - 1
+            rss_r = rss_from_crossproducts(C[lag - 1], restricted, target)
+            rss_u = rss_from_crossproducts(C[lag - 1], unrestricted, target)
+            f_stat = (rss_r[None] - rss_u) / lag / (rss_u / df_denom)
+            best = np.minimum(best, stats.f.sf(f_stat, lag, df_denom))
+        pvalues[w] = best
+
+    dates = indicators.index[first_end - 1:]
+    return pvalues, dates
+
+
+# Long-form cube: (Date, Indicator) rows x sector columns
+def cube_frame(pvalues, dates, indicators, sectors):
+    index = pd.MultiIndex.from_product([dates, indicators], names=["Date", "Indicator"])
+    return pd.DataFrame(pvalues.reshape(-1, len(sectors)), index=index, columns=sectors)
+
+
+def save_cube(cube, path_stem):
+    try:
+        cube.to_parquet(f"{path_stem}.parquet")
+        return f"{path_stem}.parquet"
+    except ImportError:
+        cube.to_csv(f"{path_stem}.csv")
+        return f"{path_stem}.csv"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling-window Granger p-values for every indicator-sector pair.")
+    parser.add_argument("--window", type=int, default=120, help="months per window (0 = expanding)")
+    parser.add_argument("--maxlag", type=int, default=6)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--csv", action="store_true",
+                        help="also write the p-value cube (Parquet when available) and monthly top lists to output/")
+    args = parser.parse_args()
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    macro, sectors = load_granger_inputs()
+
+    start = time.perf_counter()
+    pvalues, dates = rolling_granger(macro, sectors, args.window or None, args.maxlag)
+    elapsed = time.perf_counter() - start
+
+    cube = cube_frame(pvalues, dates, macro.columns, sectors.columns)
+    mode = f"w{args.window}" if args.window else "expanding"
+
+    # Monthly re-selection from the cube
+    top = pd.DataFrame([top_indicators(cube.loc[date], args.top, args.alpha) for date in dates],
+                       index=pd.Index(dates, name="Date"), columns=[f"Rank_{i + 1}" for i in range(args.top)])
+
+    print(f"{len(dates)} windows x {len(macro.columns)} indicators x {len(sectors.columns)} sectors in {elapsed:.2f}s")
+    print(f"Top indicators at {dates[-1].date()}:", ", ".join(top.iloc[-1]))
+    if args.csv:
+        os.makedirs("output", exist_ok=True)
+        path = save_cube(cube, f"output/rolling_granger_{mode}_{timestamp}")
+        top.to_csv(f"output/rolling_top_indicators_{mode}_{timestamp}.csv")
+        print(f"Saved: {path}, output/rolling_top_indicators_{mode}_{timestamp}.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import pandas as pd
+import numpy as np
+import os
+import re
+import glob
+import json
+import sqlite3
+import hashlib
+import argparse
+from io import StringIO
+from datetime import datetime
+
+# === Run registry ===
+# One SQLite file holds every regime run instead of timestamp-suffixed CSVs:
+#   runs    one row per fitted configuration, keyed by run_id and indexed on
+#           (n_regimes, indicator_set, split); sweep_id groups runs that
+#           were fitted together
+#   series  decoded regime and regime probabilities per (run_id, date)
+#   frames  any other per-run table (performance metrics, weights, ...)
+#           stored as JSON, fetched by (run_id, name)
+# Walk-forward runs (walk_forward.py) are registered with split "expanding":
+# they have no single train/predict split, so latest_sweep skips them.
+
+REGISTRY_PATH = os.path.join("output", "runs.sqlite")
+EXPANDING_SPLIT = "expanding"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    sweep_id TEXT,
+    created TEXT,
+    n_regimes INTEGER,
+    covariance_type TEXT,
+    seed INTEGER,
+    indicator_set TEXT,
+    indicators TEXT,
+    split TEXT,
+    train_start TEXT,
+    train_end TEXT,
+    predict_start TEXT,
+    predict_end TEXT,
+    log_likelihood REAL,
+    n_iter INTEGER,
+    converged INTEGER,
+    fit_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS runs_lookup ON runs (n_regimes, indicator_set, split);
+CREATE INDEX IF NOT EXISTS runs_sweep ON runs (sweep_id);
+CREATE TABLE IF NOT EXISTS series (
+    run_id TEXT,
+    date TEXT,
+    regime INTEGER,
+    probs TEXT,
+    PRIMARY KEY (run_id, date)
+);
+CREATE TABLE IF NOT EXISTS frames (
+    run_id TEXT,
+    name TEXT,
+    data TEXT,
+    PRIMARY KEY (run_id, name)
+);
+"""
+
+
+def connect(path=REGISTRY_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# Short stable key for an indicator list (order-insensitive)
+def indicator_set_key(indicators):
+    return hashlib.sha1(json.dumps(sorted(indicators)).encode()).hexdigest()[:12]
+
+
+def split_key(train_fraction):
+    return f"{train_fraction:.2f}"
+
+
+def _date(value):
+    return None if value is None else str(pd.Timestamp(value).date())
+
+
+def register_run(conn, run_id, sweep_id, n_regimes, covariance_type=None, seed=None, indicators=None, split=None,
+                 train_index=None, predict_index=None, log_likelihood=None, n_iter=None, converged=None,
+                 fit_seconds=None):
+    row = {
+        "run_id": run_id,
+        "sweep_id": sweep_id,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "n_regimes": int(n_regimes),
+        "covariance_type": covariance_type,
+        "seed": seed,
+        "indicator_set": indicator_set_key(indicators) if indicators is not None else None,
+        "indicators": json.dumps(list(indicators)) if indicators is not None else None,
+        "split": split,
+        "train_start": _date(train_index[0]) if train_index is not None else None,
+        "train_end": _date(train_index[-1]) if train_index is not None else None,
+        "predict_start": _date(predict_index[0]) if predict_index is not None else None,
+        "predict_end": _date(predict_index[-1]) if predict_index is not None else None,
+        "log_likelihood": None if log_likelihood is None else float(log_likelihood),
+        "n_iter": None if n_iter is None else int(n_iter),
+        "converged": None if converged is None else int(converged),
+        "fit_seconds": fit_seconds,
+    }
+    with conn:
+        conn.execute(f"INSERT OR REPLACE INTO runs ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                     list(row.values()))
+
+
+def save_series(conn, run_id, dates, states, probs=None):
+    rows = [(run_id, _date(d), int(s), None if probs is None else json.dumps([float(p) for p in probs[i]]))
+            for i, (d, s) in enumerate(zip(dates, states))]
+    with conn:
+        conn.execute("DELETE FROM series WHERE run_id = ?", (run_id,))
+        conn.executemany("INSERT INTO series VALUES (?, ?, ?, ?)", rows)
+
+
+def save_frame(conn, run_id, name, df):
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO frames VALUES (?, ?, ?)",
+                     (run_id, name, df.to_json(orient="split", date_format="iso")))
+
+
+# Runs matching every given field, newest first
+def find_runs(conn, **filters):
+    filters = {k: v for k, v in filters.items() if v is not None}
+    where = " AND ".join(f"{k} = ?" for k in filters) or "1"
+    return pd.read_sql_query(f"SELECT * FROM runs WHERE {where} ORDER BY created DESC, run_id",
+                             conn, params=list(filters.values()))
+
+
+def latest_sweep(conn, n_regimes=None):
+    runs = find_runs(conn, n_regimes=n_regimes)
+    runs = runs[runs["split"] != EXPANDING_SPLIT]
+    if runs.empty:
+        raise LookupError(f"No runs in the registry for n_regimes={n_regimes}")
+    return runs["sweep_id"].iloc[0]
+
+
+def run_id_for(conn, sweep_id, n_regimes, covariance_type="full"):
+    runs = find_runs(conn, sweep_id=sweep_id, n_regimes=n_regimes)
+    runs = runs[runs["covariance_type"].isna() | (runs["covariance_type"] == covariance_type)]
+    if runs.empty:
+        raise LookupError(f"No n={n_regimes} run in sweep {sweep_id}")
+    return runs["run_id"].iloc[0]
+
+
+# Regime column plus Regime_<i> probability columns, indexed by Date
+def load_series(conn, run_id):
+    series = pd.read_sql_query("SELECT date, regime, probs FROM series WHERE run_id = ? ORDER BY date",
+                               conn, params=[run_id], parse_dates=["date"])
+    df = pd.DataFrame({"Regime": series["regime"].to_numpy()}, index=pd.Index(series["date"], name="Date"))
+    if series["probs"].notna().all() and len(series):
+        probs = np.array([json.loads(p) for p in series["probs"]])
+        for i in range(probs.shape[1]):
+            df[f"Regime_{i}"] = probs[:, i]
+    return df
+
+
+def load_frame(conn, run_id, name):
+    row = conn.execute("SELECT data FROM frames WHERE run_id = ? AND name = ?", (run_id, name)).fetchone()
+    if row is None:
+        raise LookupError(f"No '{name}' table for run {run_id}")
+    return pd.read_json(StringIO(row[0]), orient="split")
+
+
+# === Import legacy <name>_n<k>_<YYYYmmdd_HHMMSS>.csv files ===
+LEGACY_FILE = re.compile(r"^(?P<name>.+?)_n(?P<n>\d+)(?:_(?P<cov>full|diag|tied|spherical))?_(?P<ts>\d{8}_\d{6})\.csv$")
+
+
+def import_directory(conn, directory):
+    imported = 0
+    for path in sorted(glob.glob(os.path.join(directory, "*.csv"))):
+        match = LEGACY_FILE.match(os.path.basename(path))
+        if not match:
+            continue
+        name, n_regimes, sweep_id = match["name"], int(match["n"]), match["ts"]
+        run_id = f"{sweep_id}_n{n_regimes}" + (f"_{match['cov']}" if match["cov"] else "")
+        if not find_runs(conn, run_id=run_id).size:
+            register_run(conn, run_id, sweep_id, n_regimes, covariance_type=match["cov"] or "full")
+
+        if name == "rolling_pred_30pct_regime":
+            df = pd.read_csv(path, parse_dates=["Date"], index_col="Date")
+            save_series(conn, run_id, df.index, df["Regime"])
+        else:
+            with open(path) as f:
+                first_column = f.readline().split(",")[0]
+            df = pd.read_csv(path, index_col=0, parse_dates=[0] if first_column == "Date" else False)
+            save_frame(conn, run_id, name, df)
+        imported += 1
+    return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or populate the regime run registry.")
+    # --registry on every subcommand (a parent-parser option would have to come before the command)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--registry", default=REGISTRY_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    listing = sub.add_parser("list", help="list runs", parents=[common])
+    listing.add_argument("--regimes", type=int, default=None)
+    listing.add_argument("--sweep", default=None)
+    listing.add_argument("--covariance-type", default=None)
+    importing = sub.add_parser("import", help="import timestamp-suffixed CSVs from a directory", parents=[common])
+    importing.add_argument("directory")
+    args = parser.parse_args()
+
+    conn = connect(args.registry)
+    if args.command == "import":
+        print(f"Imported {import_directory(conn, args.directory)} files from {args.directory} into {args.registry}")
+    else:
+        runs = find_runs(conn, n_regimes=args.regimes, sweep_id=args.sweep, covariance_type=args.covariance_type)
+        columns = ["run_id", "n_regimes", "covariance_type", "indicator_set", "split", "log_likelihood", "n_iter"]
+        print(runs[columns].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import pandas as pd
+import numpy as np
+
+# === Synthetic macro / regime data ===
+# Observations drawn from a known Gaussian HMM, for benchmarks and checks at
+# sizes the 290-month master dataset never reaches (T up to millions of rows,
+# D up to hundreds of indicators, K up to tens of regimes):
+#   random_hmm     sticky transition matrix, well separated regime means and
+#                  random well-conditioned covariances (low-rank factor plus
+#                  diagonal, so D in the hundreds stays cheap to build)
+#   sample_hmm     state path and (T, D) observations. The path is drawn run by
+#                  run (geometric run length from the self-transition, then
+#                  the next regime from the rest of the row), so generating
+#                  T = 10^6 costs one Python step per regime switch, not per row.
+#   raw_series     a daily-style random walk for the cleaning stage
+#   asset_returns  (T, N) returns whose mean and volatility depend on the regime
+
+
+def random_hmm(n_regimes, n_features, seed=0, stay=0.95, separation=1.5, rank=4):
+    rng = np.random.default_rng(seed)
+    off = rng.dirichlet(np.ones(max(n_regimes - 1, 1)), size=n_regimes) * (1 - stay)
+    transmat = np.zeros((n_regimes, n_regimes))
+    for k in range(n_regimes):
+        transmat[k, np.arange(n_regimes) != k] = off[k, :n_regimes - 1]
+        transmat[k, k] = stay if n_regimes > 1 else 1.0
+    factors = rng.normal(size=(n_regimes, n_features, rank)) / np.sqrt(rank)
+    diag = rng.uniform(0.5, 1.5, size=(n_regimes, n_features))
+    covars = factors @ factors.swapaxes(1, 2) + diag[:, :, None] * np.eye(n_features)
+    return {
+        "startprob": np.full(n_regimes, 1 / n_regimes),
+        "transmat": transmat,
+        "means": rng.normal(scale=separation, size=(n_regimes, n_features)),
+        "covars": covars,
+    }
+
+
+# (T,) regime path and (T, D) observations from an HMM's parameters
+def sample_hmm(params, T, seed=0, dtype="float64"):
+    rng = np.random.default_rng(seed)
+    transmat = params["transmat"]
+    n_regimes = len(transmat)
+    stay = np.diag(transmat)
+    states = np.empty(T, dtype=int)
+    t, k = 0, rng.choice(n_regimes, p=params["startprob"])
+    while t < T:
+        length = rng.geometric(1 - stay[k]) if stay[k] < 1 else T
+        states[t:t + length] = k
+        t += length
+        if n_regimes > 1:
+            jump = np.where(np.arange(n_regimes) == k, 0.0, transmat[k])
+            k = rng.choice(n_regimes, p=jump / jump.sum())
+
+    chol = np.linalg.cholesky(params["covars"])
+    X = np.empty((T, params["means"].shape[1]), dtype=dtype)
+    for k in range(n_regimes):
+        rows = np.flatnonzero(states == k)
+        z = rng.standard_normal((len(rows), X.shape[1]))
+        X[rows] = params["means"][k] + z @ chol[k].T
+    return states, X
+
+
+# GaussianHMM carrying the given parameters (full covariances), e.g. to decode with the true model
+def hmm_model(params):
+    from hmmlearn import hmm
+
+    n_regimes, n_features = params["means"].shape
+    model = hmm.GaussianHMM(n_components=n_regimes, covariance_type="full")
+    model.n_features = n_features
+    model.startprob_ = params["startprob"]
+    model.transmat_ = params["transmat"]
+    model.means_ = params["means"]
+    model.covars_ = params["covars"]
+    return model
+
+
+def frame(X, start="1990-01-01", freq="h", prefix="Indicator", name="Date"):
+    index = pd.date_range(start, periods=len(X), freq=freq, name=name)
+    return pd.DataFrame(X, index=index, columns=[f"{prefix}_{i}" for i in range(X.shape[1])])
+
+
+# One raw series (a random walk with missing observations), in the layout of fred_series/*.csv
+def raw_series(T, seed=0, freq="h", missing=0.02, start="1990-01-01"):
+    rng = np.random.default_rng(seed)
+    values = 100 + np.cumsum(rng.normal(scale=0.1, size=T))
+    values[rng.random(T) < missing] = np.nan
+    return pd.DataFrame({"Value": values}, index=pd.date_range(start, periods=T, freq=freq, name="Date"))
+
+
+# (T, N) asset returns: regime k shifts every asset's mean and scales its volatility
+def asset_returns(states, n_assets, seed=0):
+    rng = np.random.default_rng(seed)
+    n_regimes = states.max() + 1
+    mean = rng.normal(0.005, 0.01, size=(n_regimes, n_assets))
+    vol = rng.uniform(0.02, 0.08, size=(n_regimes, 1))
+    return mean[states] + vol[states] * rng.standard_normal((len(states), n_assets))
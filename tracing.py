@@ -0,0 +1,169 @@
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+from contextlib import contextmanager, nullcontext
+
+# === Run tracing ===
+# span(name) times a block of work: wall and CPU seconds, and the process's
+# peak RSS when the block ends. event(name) records one point, such as an EM
+# iteration. Both go to the active record buffer. With no buffer active (the
+# default), span() returns a shared no-op context manager and event() returns
+# at once, so instrumented code costs nothing while tracing is off.
+# Spans nest: each record carries the "/"-joined path of its enclosing spans.
+# Worker processes record into their own buffer (recording()) and send it
+# back with their result; the parent folds it in with extend(), and write()
+# saves {"meta", "records"} as one JSON file per run.
+
+_records = None
+_stack = []
+_NULL = nullcontext()
+
+
+def enabled():
+    return _records is not None
+
+
+def enable():
+    global _records
+    _records = []
+
+
+# Stop tracing; returns the records collected so far
+def disable():
+    global _records
+    records, _records = _records, None
+    _stack.clear()
+    return records or []
+
+
+# ru_maxrss is in kilobytes on Linux but in bytes on macOS
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def _path(name):
+    return "/".join(_stack + [name])
+
+
+def span(name, **fields):
+    if _records is None:
+        return _NULL
+    return _span(name, fields)
+
+
+@contextmanager
+def _span(name, fields):
+    record = {"kind": "span", "name": name, "path": _path(name), "pid": os.getpid(), "start": time.time(), **fields}
+    _stack.append(name)
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        _stack.pop()
+        record["wall"] = time.perf_counter() - wall
+        record["cpu"] = time.process_time() - cpu
+        record["peak_rss_mb"] = _peak_rss_mb()
+        _records.append(record)
+
+
+def event(name, **fields):
+    if _records is None:
+        return
+    _records.append({"kind": "event", "name": name, "path": _path(name), "pid": os.getpid(), "time": time.time(),
+                     **fields})
+
+
+# Fresh buffer for one task (typically in a worker process); yields the task's records, or None when off
+@contextmanager
+def recording(on=True):
+    global _records
+    if not on:
+        yield None
+        return
+    saved, saved_stack = _records, _stack[:]
+    _records = []
+    _stack[:] = []
+    try:
+        yield _records
+    finally:
+        _records = saved
+        _stack[:] = saved_stack
+
+
+# Fold records returned by a worker into the active buffer, under the current span
+def extend(records):
+    if _records is None or not records:
+        return
+    prefix = "/".join(_stack)
+    for record in records:
+        _records.append({**record, "path": f"{prefix}/{record['path']}" if prefix else record["path"]})
+
+
+# Record each EM iteration of an hmmlearn model's fit: log-likelihood and seconds since the previous one
+# (the first includes initialisation)
+@contextmanager
+def em_iterations(model, **fields):
+    if _records is None:
+        yield
+        return
+    monitor = model.monitor_
+    last = [time.perf_counter()]
+
+    def report(log_prob):
+        now = time.perf_counter()
+        event("em_iteration", iteration=len(monitor.history) + 1, log_likelihood=float(log_prob),
+              seconds=now - last[0], **fields)
+        last[0] = now
+        type(monitor).report(monitor, log_prob)
+
+    monitor.report = report
+    try:
+        yield
+    finally:
+        del monitor.report
+
+
+def write(path, records, **meta):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    records = sorted(records, key=lambda r: r.get("start", r.get("time")))
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "records": records}, f, indent=1, default=str)
+    return path
+
+
+# Spans totalled by path: count, wall, CPU, peak RSS and share of the run's wall time
+def summarize(records):
+    import pandas as pd
+
+    spans = pd.DataFrame([r for r in records if r["kind"] == "span"])
+    if spans.empty:
+        return spans
+    summary = spans.groupby("path").agg(count=("wall", "size"), wall=("wall", "sum"), cpu=("cpu", "sum"),
+                                        peak_rss_mb=("peak_rss_mb", "max"))
+    top_level = spans.loc[~spans["path"].str.contains("/"), "wall"].sum()
+    summary["share"] = summary["wall"] / top_level
+    return summary.sort_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise a JSON run trace by span.")
+    parser.add_argument("path")
+    parser.add_argument("--events", action="store_true", help="also list the recorded events")
+    args = parser.parse_args()
+
+    with open(args.path) as f:
+        trace = json.load(f)
+    print(json.dumps(trace["meta"]))
+    print(summarize(trace["records"]).round(4).to_string())
+    if args.events:
+        import pandas as pd
+
+        print(pd.DataFrame([r for r in trace["records"] if r["kind"] == "event"]).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+import logging
+import argparse
+from sklearn.preprocessing import StandardScaler
+from hmmlearn import hmm
+from datetime import datetime
+from online_filter import new_state, set_params, filter_history, update
+
+# === Walk-forward (expanding window) regime backtest ===
+# Month t is labelled by a model fitted on months [0, t) only. Instead of a
+# fresh fit every month:
+#   - the scaler statistics are updated with StandardScaler.partial_fit on
+#     the newly available month
+#   - the previous model's means/covariances are re-expressed in the new
+#     scaling and EM continues from there for at most `warm_iter` iterations.
+#     For full, tied and diag covariances this is an exact affine change of
+#     variables; a spherical covariance has one variance for all features, so
+#     it is scaled by the mean squared scale ratio (an approximation)
+#   - month t's probabilities come from an online_filter forward step: the
+#     forward vector is carried from month to month and only the new month
+#     is scaled and folded in, so past rows are never re-decoded or
+#     re-scaled. Warm starts keep regime numbering stable from one month to
+#     the next, which carrying the vector relies on; cold refits can permute
+#     the regimes, so --cold decodes the whole prefix under each new model.
+
+logging.getLogger("hmmlearn.base").setLevel(logging.ERROR)
+
+
+# Symmetrize and floor eigenvalues at min_covar: a regime that loses all its
+# months during a refit can be left with a singular covariance
+def _floor_covars(covars, min_covar):
+    covars = (covars + np.swapaxes(covars, -1, -2)) / 2
+    eigvals, eigvecs = np.linalg.eigh(covars)
+    if eigvals.min() >= min_covar:
+        return covars
+    eigvals = np.maximum(eigvals, min_covar)
+    return (eigvecs * eigvals[..., None, :]) @ np.swapaxes(eigvecs, -1, -2)
+
+
+# Map GaussianHMM emission parameters from the old scaler's space to the new one
+def rescale_params(model, old_mean, old_scale, scaler):
+    ratio = old_scale / scaler.scale_
+    shift = (old_mean - scaler.mean_) / scaler.scale_
+    model.means_ = model.means_ * ratio + shift
+
+    covars = model._covars_
+    if model.covariance_type in ("full", "tied"):
+        covars = _floor_covars(covars * np.outer(ratio, ratio), model.min_covar)
+    elif model.covariance_type == "diag":
+        covars = np.maximum(covars * ratio ** 2, model.min_covar)
+    else:
+        covars = np.maximum(covars * np.mean(ratio ** 2), model.min_covar)
+    model.covars_ = covars
+
+
+def walk_forward(macro_window, n_regimes=4, covariance_type="full", min_train=None, train_fraction=0.7,
+                 seed=42, n_iter=100, warm_iter=10, warm_start=True):
+    X = macro_window.to_numpy(dtype=float)
+    start = min_train or int(len(X) * train_fraction)
+
+    # Initial full fit on the first `start` months
+    scaler = StandardScaler().fit(X[:start])
+    model = hmm.GaussianHMM(n_components=n_regimes, covariance_type=covariance_type, n_iter=n_iter, random_state=seed)
+    model.fit(scaler.transform(X[:start]))
+
+    # Forward vector through month start - 1 under the initial model
+    state = new_state(model, scaler, list(macro_window.columns))
+    filter_history(state, X[:start], macro_window.index[:start])
+
+    rows = []
+    for t in range(start, len(X)):
+        fit_start = time.perf_counter()
+        if t > start:
+            old_mean, old_scale = scaler.mean_.copy(), scaler.scale_.copy()
+            scaler.partial_fit(X[t - 1:t])
+            if warm_start:
+                rescale_params(model, old_mean, old_scale, scaler)
+                model.init_params = ""
+                model.n_iter = warm_iter
+            else:
+                model = hmm.GaussianHMM(n_components=n_regimes, covariance_type=covariance_type,
+                                        n_iter=n_iter, random_state=seed)
+            model.fit(scaler.transform(X[:t]))
+        fit_seconds = time.perf_counter() - fit_start
+
+        # Filtered probabilities for month t use no later data
+        if warm_start:
+            probs = update(set_params(state, model, scaler), X[t], macro_window.index[t])
+        else:
+            probs = model.predict_proba(scaler.transform(X[:t + 1]))[-1]
+        rows.append({
+            "Date": macro_window.index[t],
+            "Regime": int(np.argmax(probs)),
+            **{f"Regime_{i}": p for i, p in enumerate(probs)},
+            "train_months": t,
+            "n_iter": len(model.monitor_.history),
+            "log_likelihood": model.monitor_.history[-1],
+            "fit_seconds": fit_seconds,
+        })
+    return pd.DataFrame(rows).set_index("Date"), model, scaler
+
+
+# Register one walk-forward result: probabilities as the run's series, per-month fit details as "walk_forward_log"
+def save_walk_forward(conn, results, sweep_id, n_regimes, covariance_type, seed, indicators, train_index):
+    from run_registry import EXPANDING_SPLIT, register_run, save_series, save_frame
+
+    run_id = f"{sweep_id}_n{n_regimes}" if covariance_type == "full" else f"{sweep_id}_n{n_regimes}_{covariance_type}"
+    probs = results[[f"Regime_{i}" for i in range(n_regimes)]].to_numpy()
+    register_run(conn, run_id, sweep_id, n_regimes, covariance_type, seed, indicators, EXPANDING_SPLIT,
+                 train_index, results.index, results["log_likelihood"].iloc[-1], int(results["n_iter"].sum()),
+                 None, float(results["fit_seconds"].sum()))
+    save_series(conn, run_id, results.index, results["Regime"].to_numpy(), probs)
+    save_frame(conn, run_id, "walk_forward_log", results[["train_months", "n_iter", "log_likelihood", "fit_seconds"]])
+    return run_id
+
+
+def main():
+    from regime_builder_702 import load_macro_window
+    from run_registry import connect
+
+    parser = argparse.ArgumentParser(description="Monthly expanding-window regime backtest with warm-started refits.")
+    parser.add_argument("--regimes", type=int, nargs="+", default=[4])
+    parser.add_argument("--covariance-type", default="full", choices=["full", "diag", "tied", "spherical"])
+    parser.add_argument("--min-train", type=int, default=None, help="months in the first fit (default: 70%%)")
+    parser.add_argument("--warm-iter", type=int, default=10, help="EM iterations per warm-started monthly refit")
+    parser.add_argument("--cold", action="store_true", help="refit from scratch every month (for comparison)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--csv", action="store_true", help="also write output/walk_forward_<mode>_n<k>_<timestamp>.csv")
+    args = parser.parse_args()
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    macro_window = load_macro_window()
+    conn = connect()
+
+    for n_regimes in args.regimes:
+        start = time.perf_counter()
+        results, model, scaler = walk_forward(macro_window, n_regimes, args.covariance_type, args.min_train,
+                                              seed=args.seed, warm_iter=args.warm_iter, warm_start=not args.cold)
+        mode = "cold" if args.cold else "warm"
+        first = macro_window.index.get_loc(results.index[0])
+        run_id = save_walk_forward(conn, results, f"{timestamp}_walk_forward_{mode}", n_regimes, args.covariance_type,
+                                   args.seed, list(macro_window.columns), macro_window.index[:first])
+        if args.csv:
+            os.makedirs("output", exist_ok=True)
+            results.to_csv(f'output/walk_forward_{mode}_n{n_regimes}_{timestamp}.csv')
+        print(f"n={n_regimes} ({mode}): {len(results)} monthly refits, "
+              f"{results['n_iter'].sum()} EM iterations in {time.perf_counter() - start:.2f}s, registered as {run_id}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()